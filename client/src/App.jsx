@@ -5,30 +5,71 @@ function App() {
   const [messages, setMessages] = useState([])
   const [input, setInput] = useState('')
   const [loading, setLoading] = useState(false)
+  const [conversationId, setConversationId] = useState(null)
   const messagesEndRef = useRef(null)
 
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' })
   }, [messages])
 
+  // Replace the last (streaming) agent message with the result of update(msg)
+  const updateLastMessage = (update) => {
+    setMessages(prev => [...prev.slice(0, -1), update(prev[prev.length - 1])])
+  }
+
+  const handleEvent = (event) => {
+    if (event.event === 'token') {
+      updateLastMessage(msg => ({ ...msg, content: msg.content + event.content }))
+    } else if (event.event === 'tool_start') {
+      updateLastMessage(msg => ({ ...msg, tools: [...msg.tools, { id: event.id, name: event.tool, status: 'running' }] }))
+    } else if (event.event === 'tool_end') {
+      const status = event.success ? 'done' : 'failed'
+      updateLastMessage(msg => ({
+        ...msg,
+        tools: msg.tools.map(t => (t.id === event.id ? { ...t, status } : t)),
+      }))
+    } else if (event.event === 'done') {
+      if (event.conversation_id) setConversationId(event.conversation_id)
+      updateLastMessage(msg => ({ ...msg, content: event.response || msg.content }))
+    } else if (event.event === 'error') {
+      updateLastMessage(msg => ({ ...msg, content: `Error: ${event.error}` }))
+    }
+  }
+
   const sendMessage = async () => {
     const query = input.trim()
     if (!query || loading) return
 
-    setMessages(prev => [...prev, { role: 'user', content: query }])
+    setMessages(prev => [
+      ...prev,
+      { role: 'user', content: query },
+      { role: 'agent', content: '', tools: [] },
+    ])
     setInput('')
     setLoading(true)
 
     try {
-      const res = await fetch('/chat', {
+      const res = await fetch('/chat/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ query, history: messages }),
+        body: JSON.stringify({ query, conversation_id: conversationId, new_conversation: !conversationId }),
       })
-      const data = await res.json()
-      setMessages(prev => [...prev, { role: 'agent', content: data.response || JSON.stringify(data) }])
+      const reader = res.body.pipeThrough(new TextDecoderStream()).getReader()
+      let buffer = ''
+      while (true) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += value
+        // Server-Sent Events are separated by a blank line
+        const frames = buffer.split('\n\n')
+        buffer = frames.pop()
+        for (const frame of frames) {
+          const data = frame.split('\n').find(line => line.startsWith('data: '))
+          if (data) handleEvent(JSON.parse(data.slice(6)))
+        }
+      }
     } catch (err) {
-      setMessages(prev => [...prev, { role: 'agent', content: 'Error: Failed to connect to server.' }])
+      updateLastMessage(msg => ({ ...msg, content: 'Error: Failed to connect to server.' }))
     } finally {
       setLoading(false)
     }
@@ -54,15 +95,22 @@ function App() {
         {messages.map((msg, i) => (
           <div key={i} className={`message ${msg.role}`}>
             <div className="message-label">{msg.role === 'user' ? 'You' : 'Agent'}</div>
-            <div className="message-content">{msg.content}</div>
+            {msg.tools?.length > 0 && (
+              <div className="message-tools">
+                {msg.tools.map(tool => (
+                  <div key={tool.id} className={`tool-call ${tool.status}`}>
+                    {tool.name} · {tool.status}
+                  </div>
+                ))}
+              </div>
+            )}
+            {msg.content ? (
+              <div className="message-content">{msg.content}</div>
+            ) : (
+              loading && i === messages.length - 1 && <div className="message-content typing">Thinking...</div>
+            )}
           </div>
         ))}
-        {loading && (
-          <div className="message agent">
-            <div className="message-label">Agent</div>
-            <div className="message-content typing">Thinking...</div>
-          </div>
-        )}
         <div ref={messagesEndRef} />
       </div>
 
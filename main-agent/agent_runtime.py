@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import threading
+import time
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_openai import ChatOpenAI
+from model.schema import OrderExtraction
+from metrics import inc, observe
+import tools
+import config
+
+logger = logging.getLogger("agent_runtime")
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Records latency and token usage of every chat model call, streamed or not."""
+
+    # Cheap bookkeeping; safe to run on the event loop instead of an executor
+    run_inline = True
+
+    def __init__(self, model: str):
+        self.model = model
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        elapsed = time.perf_counter() - self._started.pop(run_id, time.perf_counter())
+        message = getattr(response.generations[0][0], "message", None) if response.generations else None
+        usage = getattr(message, "usage_metadata", None) or {}
+        observe("agent_llm_request_seconds", elapsed, model=self.model, status="ok")
+        inc("agent_llm_tokens_total", usage.get("input_tokens", 0), model=self.model, kind="prompt")
+        inc("agent_llm_tokens_total", usage.get("output_tokens", 0), model=self.model, kind="completion")
+        logger.info(
+            f"[LLM] {self.model} elapsed={elapsed * 1000:.0f}ms "
+            f"prompt_tokens={usage.get('input_tokens', 0)} completion_tokens={usage.get('output_tokens', 0)}"
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        elapsed = time.perf_counter() - self._started.pop(run_id, time.perf_counter())
+        observe("agent_llm_request_seconds", elapsed, model=self.model, status="error")
+
+
+class BoundProfile:
+    """The chat model bound to one tool profile, plus the tools it may call."""
+
+    def __init__(self, llm, tool_map: dict):
+        self.llm = llm
+        self.tool_map = tool_map
+
+
+class AgentRuntime:
+    """Process-lifetime state shared by every agent request.
+
+    Owns the pooled HTTP clients used to talk to OpenAI, the bound chat models
+    (one per tool profile), the tool registry and the tool schemas (serialized
+    once, not per request).
+    """
+
+    def __init__(self, tool_list: list):
+        limits = httpx.Limits(
+            max_connections=config.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=config.OPENAI_MAX_CONNECTIONS,
+        )
+        self.http_client = httpx.Client(limits=limits)
+        self.http_async_client = httpx.AsyncClient(limits=limits)
+
+        self.tools = list(tool_list)
+        self.tool_map = {t.name: t for t in self.tools}
+        self.tool_schemas = [convert_to_openai_tool(t) for t in self.tools]
+
+        base = self._chat_model(config.OPENAI_MODEL)
+        self.llm = base.bind_tools(self.tool_schemas)
+        schemas = dict(zip(self.tool_map, self.tool_schemas))
+        self.profiles = {}
+        for name, tool_names in tools.TOOL_PROFILES.items():
+            if tool_names is None:
+                self.profiles[name] = BoundProfile(self.llm, self.tool_map)
+            else:
+                self.profiles[name] = BoundProfile(
+                    base.bind_tools([schemas[tool_name] for tool_name in tool_names]),
+                    {tool_name: self.tool_map[tool_name] for tool_name in tool_names},
+                )
+        self.extractor = self._chat_model(config.OPENAI_MODEL).with_structured_output(
+            OrderExtraction, include_raw=True
+        )
+        self.summarizer = self._chat_model(config.SUMMARY_MODEL)
+        self.fingerprint = _fingerprint()
+
+    def profile(self, name: str = None) -> BoundProfile:
+        """Bound model and tools for a profile in tools.TOOL_PROFILES; None means every tool."""
+        if name is None:
+            return self.profiles.get("admin") or BoundProfile(self.llm, self.tool_map)
+        return self.profiles[name]
+
+    def _chat_model(self, model: str) -> ChatOpenAI:
+        return ChatOpenAI(
+            model=model,
+            temperature=0,
+            api_key=config.OPENAI_API_KEY,
+            stream_usage=True,
+            callbacks=[LLMMetricsCallback(model)],
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+        )
+
+    async def aclose(self):
+        await self.http_async_client.aclose()
+        self.http_client.close()
+
+    def close(self, loop=None):
+        """Close the pools from any thread; the async client is closed on loop, where it was used."""
+        self.http_client.close()
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.http_async_client.aclose(), loop).result()
+        else:
+            asyncio.run(self.http_async_client.aclose())
+
+
+def _fingerprint():
+    """Changes whenever the model settings or the registered tools change."""
+    return (
+        config.OPENAI_MODEL,
+        config.SUMMARY_MODEL,
+        config.OPENAI_API_KEY,
+        tuple(id(t) for t in tools.ALL_TOOLS),
+        tuple((name, tuple(names or ())) for name, names in tools.TOOL_PROFILES.items()),
+    )
+
+
+_runtime = None
+_lock = threading.Lock()
+# The app's event loop, where the async clients' connections live
+_loop = None
+
+
+def _remember_loop():
+    global _loop
+    try:
+        _loop = asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+
+
+def _retire(runtime):
+    """Close a replaced runtime's pools once requests already using it have had time to finish."""
+    if runtime is None:
+        return
+
+    def close():
+        try:
+            runtime.close(_loop)
+        except Exception as e:
+            logger.warning(f"Closing a replaced agent runtime failed: {e}")
+
+    timer = threading.Timer(config.RUNTIME_CLOSE_GRACE_SECONDS, close)
+    timer.daemon = True
+    timer.start()
+
+
+def _swap(runtime: AgentRuntime) -> AgentRuntime:
+    global _runtime
+    previous, _runtime = _runtime, runtime
+    _retire(previous)
+    return runtime
+
+
+def get_runtime() -> AgentRuntime:
+    """Return the shared runtime, rebuilding it if config or ALL_TOOLS changed."""
+    _remember_loop()
+    if _runtime is None or _runtime.fingerprint != _fingerprint():
+        with _lock:
+            if _runtime is None or _runtime.fingerprint != _fingerprint():
+                _swap(AgentRuntime(tools.ALL_TOOLS))
+    return _runtime
+
+
+def reload_runtime() -> AgentRuntime:
+    """Force a rebuild, e.g. after editing a tool in place or rotating the API key.
+
+    Requests already running keep the previous runtime; its connection pools are
+    closed RUNTIME_CLOSE_GRACE_SECONDS later.
+    """
+    _remember_loop()
+    with _lock:
+        return _swap(AgentRuntime(tools.ALL_TOOLS))
+
+
+async def close_runtime():
+    global _runtime
+    if _runtime is not None:
+        await _runtime.aclose()
+        _runtime = None
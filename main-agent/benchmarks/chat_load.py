@@ -0,0 +1,78 @@
+"""Concurrent /chat throughput: blocking mainAgent vs. async amainAgent.
+
+The OpenAI model is replaced by a fake that sleeps for a fixed latency, so the
+numbers show how many chats one worker can overlap rather than model speed.
+
+Run from main-agent/:
+    python -m benchmarks.chat_load --requests 50 --latency 0.5
+"""
+import argparse
+import asyncio
+import time
+from fastapi import FastAPI, Request
+import httpx
+from langchain_core.messages import AIMessage
+import mainAgent as agent
+from benchmarks.fakes import install_chat_model, isolate_caches, use_estimated_tokens
+
+
+class FakeChatModel:
+    """Stands in for the bound ChatOpenAI model; answers without tool calls."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def invoke(self, messages):
+        time.sleep(self.latency)
+        return AIMessage(content="ok")
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.latency)
+        return AIMessage(content="ok")
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/chat-blocking")
+    async def chat_blocking(request: Request):
+        # Previous /chat behaviour: sync agent called straight from an async route
+        data = await request.json()
+        return agent.mainAgent(data.get("query", ""), data.get("history"))
+
+    @app.post("/chat")
+    async def chat(request: Request):
+        data = await request.json()
+        return await agent.amainAgent(data.get("query", ""), data.get("history"))
+
+    return app
+
+
+async def run(path: str, total: int) -> float:
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            client.post(path, json={"query": f"request {i}"}) for i in range(total)
+        ])
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake model latency in seconds")
+    args = parser.parse_args()
+
+    # Otherwise the "after" run replays the "before" run's identical prompts from the cache
+    isolate_caches()
+    use_estimated_tokens()
+    install_chat_model(FakeChatModel(args.latency))
+
+    for label, path in (("before (blocking)", "/chat-blocking"), ("after (async)", "/chat")):
+        elapsed = asyncio.run(run(path, args.requests))
+        print(f"{label:18} {args.requests} requests in {elapsed:.2f}s -> {args.requests / elapsed:.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
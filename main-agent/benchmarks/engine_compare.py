@@ -0,0 +1,72 @@
+"""Tool-calling loop vs. single-call structured extraction on the template emails.
+
+Uses the real OpenAI model (OPENAI_API_KEY must be set) but fake Express and
+Gmail backends, and reports latency, token usage and whether each email
+produced exactly the expected orders and a reply to the sender.
+
+Run from main-agent/:
+    python -m benchmarks.engine_compare --repeat 3
+"""
+import argparse
+import re
+import statistics
+import time
+from benchmarks.fakes import EXPECTED_ORDERS, install_fakes, isolate_caches, load_templates, ordered_products
+from extractionAgent import extractionAgent
+from mainAgent import mainAgent
+
+ENGINES = {
+    "loop": lambda query: mainAgent(query, history=None),
+    "extract": extractionAgent,
+}
+
+
+def run_engine(name: str, templates: dict, repeat: int) -> dict:
+    latencies, tokens, llm_calls, correct = [], [], [], 0
+    for _ in range(repeat):
+        for file_name, text in templates.items():
+            api, gmail = install_fakes()
+            sender = re.search(r"^From:\s*(\S+)", text, re.MULTILINE).group(1).lower()
+
+            start = time.perf_counter()
+            result = ENGINES[name](text) or {}
+            latencies.append(time.perf_counter() - start)
+
+            usage = result.get("usage") or {}
+            tokens.append(usage.get("total_tokens", 0))
+            llm_calls.append(usage.get("llm_calls", 0))
+            replied = any(mail["to"].lower() == sender for mail in gmail.sent)
+            if ordered_products(api, sender) == EXPECTED_ORDERS.get(file_name) and replied:
+                correct += 1
+
+    runs = len(latencies)
+    return {
+        "runs": runs,
+        "latency_mean": statistics.mean(latencies),
+        "latency_max": max(latencies),
+        "tokens_mean": statistics.mean(tokens),
+        "llm_calls_mean": statistics.mean(llm_calls),
+        "correct": f"{correct}/{runs}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--engine", choices=sorted(ENGINES), action="append")
+    args = parser.parse_args()
+
+    # Every repeat must reach the model, not replay cached steps
+    isolate_caches()
+    templates = load_templates()
+    for name in args.engine or sorted(ENGINES, reverse=True):
+        stats = run_engine(name, templates, args.repeat)
+        print(
+            f"{name:8} runs={stats['runs']} latency mean={stats['latency_mean']:.2f}s "
+            f"max={stats['latency_max']:.2f}s tokens/email={stats['tokens_mean']:.0f} "
+            f"llm_calls/email={stats['llm_calls_mean']:.1f} correct={stats['correct']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
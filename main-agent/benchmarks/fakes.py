@@ -0,0 +1,415 @@
+"""In-process stand-ins for the Express API, Gmail and the chat model used by the benchmarks."""
+import ast
+import asyncio
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import httpx
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+import express_client
+import tools.gmail_tools
+from tools.product_cache import catalog_cache
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "template")
+
+PRODUCTS = [
+    {"id": 1, "name": "Laptop", "description": "15-inch developer laptop", "price": "999.99", "stock": 1000},
+    {"id": 2, "name": "Wireless Keyboard", "description": "Ergonomic wireless keyboard", "price": "49.99", "stock": 1000},
+    {"id": 3, "name": "Wireless Mouse", "description": "Ergonomic wireless mouse", "price": "29.99", "stock": 1000},
+    {"id": 4, "name": "Monitor", "description": "27-inch LED display", "price": "249.99", "stock": 1000},
+    {"id": 5, "name": "Keyboard", "description": "Mechanical wired keyboard", "price": "79.99", "stock": 1000},
+]
+
+CUSTOMERS = [
+    {"id": 1, "name": "John Doe", "email": "shreyeshk@iconnectsolutions.com", "phone": "1234567890", "address": "123 Main St, City"},
+    {"id": 2, "name": "Sarah Miller", "email": "sarah.miller@designagency.com", "phone": "310-555-9821", "address": "456 Oak Avenue, Los Angeles, CA 90001"},
+    {"id": 3, "name": "Robert Wilson", "email": "robert.wilson@globalcorp.com", "phone": "(312) 555-4567", "address": "789 Corporate Boulevard, Chicago, IL 60601"},
+]
+
+# Sequelize adds these to every record the backend returns
+TIMESTAMPS = {"createdAt": "2025-01-06T09:30:00.000Z", "updatedAt": "2025-01-06T09:30:00.000Z"}
+
+# Product IDs each template email should end up ordering, for correctness checks
+EXPECTED_ORDERS = {
+    "email1.txt": {1},
+    "email2.txt": {2, 3},
+    "email3.txt": {4, 5},
+}
+
+
+# What each template sender asks for, as the model would read it from the email
+ORDER_SCRIPTS = {
+    "shreyeshk@iconnectsolutions.com": [
+        {"product_id": 1, "name": "Laptop", "quantity": 2},
+    ],
+    "sarah.miller@designagency.com": [
+        {"product_id": None, "name": "Wireless Keyboard", "quantity": 3},
+        {"product_id": None, "name": "Wireless Mouse", "quantity": 2},
+    ],
+    "robert.wilson@globalcorp.com": [
+        {"product_id": None, "name": "Monitor", "quantity": 5},
+        {"product_id": None, "name": "Keyboard", "quantity": 5},
+    ],
+}
+
+
+def load_templates() -> dict:
+    """Return {file name: email text} for template/email*.txt."""
+    return {
+        name: open(os.path.join(TEMPLATE_DIR, name), encoding="utf-8").read()
+        for name in sorted(os.listdir(TEMPLATE_DIR))
+        if re.match(r"email\d+\.txt$", name)
+    }
+
+
+class FakeExpressAPI:
+    """Answers the subset of parcel-backend routes the tools call."""
+
+    def __init__(self):
+        self.products = {p["id"]: {**p, **TIMESTAMPS} for p in PRODUCTS}
+        self.customers = {c["id"]: {**c, **TIMESTAMPS} for c in CUSTOMERS}
+        self.orders = []
+        self.orders_by_key = {}
+        self.requests = 0
+        # Workers call in from several threads; order IDs must stay unique
+        self._lock = threading.Lock()
+
+    def _ok(self, data, status=200):
+        return httpx.Response(status, json={"success": True, "data": data})
+
+    def _new_order(self, customer, items, total) -> dict:
+        """An order in the shape the backend returns it: customer and items with their products."""
+        order_id = len(self.orders) + 1
+        order = {
+            "id": order_id,
+            "customerId": customer["id"],
+            "totalAmount": total,
+            "status": "pending",
+            **TIMESTAMPS,
+            "customer": customer,
+            "items": [
+                {"id": order_id * 100 + i, "orderId": order_id, **item, **TIMESTAMPS,
+                 "product": self.products[item["productId"]]}
+                for i, item in enumerate(items, 1)
+            ],
+        }
+        self.orders.append(order)
+        return order
+
+    def _not_found(self, what):
+        return httpx.Response(404, json={"success": False, "error": f"{what} not found"})
+
+    def handle(self, method: str, path: str, **kwargs) -> httpx.Response:
+        with self._lock:
+            return self._handle(method, path, **kwargs)
+
+    def _handle(self, method: str, path: str, params=None, json=None, headers=None, **kwargs) -> httpx.Response:
+        self.requests += 1
+        params = params or {}
+        idempotency_key = (headers or {}).get("Idempotency-Key")
+        parts = path.strip("/").split("/")
+
+        if method == "GET" and parts == ["products"]:
+            return self._ok(list(self.products.values()))
+        if method == "GET" and parts[0] == "products" and len(parts) == 2:
+            product = self.products.get(int(parts[1]))
+            return self._ok(product) if product else self._not_found("Product")
+        if method == "GET" and parts == ["customers"]:
+            return self._ok(list(self.customers.values()))
+        if method == "GET" and parts == ["customers", "search"]:
+            if "email" in params:
+                matches = [c for c in self.customers.values() if c["email"].lower() == params["email"].lower()]
+            else:
+                matches = [c for c in self.customers.values() if params.get("name", "").lower() in c["name"].lower()]
+            return self._ok(matches)
+        if method == "GET" and parts[0] == "customers" and len(parts) == 2:
+            customer = self.customers.get(int(parts[1]))
+            return self._ok(customer) if customer else self._not_found("Customer")
+        if method == "POST" and parts[0] == "customers" and parts[2:] == ["orders"]:
+            if idempotency_key in self.orders_by_key:
+                return self._ok(self.orders_by_key[idempotency_key])
+            customer = self.customers.get(int(parts[1]))
+            product = self.products.get(int(json["product_id"]))
+            if not customer or not product:
+                return self._not_found("Customer or product")
+            items = [{"productId": product["id"], "quantity": 1, "price": product["price"]}]
+            order = self._new_order(customer, items, product["price"])
+            if idempotency_key:
+                self.orders_by_key[idempotency_key] = order
+            return self._ok(order, status=201)
+        if method == "POST" and parts == ["orders"]:
+            if idempotency_key in self.orders_by_key:
+                return self._ok(self.orders_by_key[idempotency_key])
+            customer = self.customers.get(int(json["customerId"]))
+            if not customer:
+                return self._not_found("Customer")
+            items = []
+            for item in json["items"]:
+                product = self.products.get(int(item["productId"]))
+                if not product:
+                    return self._not_found(f"Product {item['productId']}")
+                items.append({"productId": product["id"], "quantity": item["quantity"], "price": product["price"]})
+            order = self._new_order(customer, items, f"{sum(float(i['price']) * i['quantity'] for i in items):.2f}")
+            if idempotency_key:
+                self.orders_by_key[idempotency_key] = order
+            return self._ok(order, status=201)
+        if method == "GET" and parts == ["orders"]:
+            return self._ok(self.orders)
+        return self._not_found("Route")
+
+    async def ahandle(self, method: str, path: str, **kwargs) -> httpx.Response:
+        return self.handle(method, path, **kwargs)
+
+
+class FakeGmail:
+    """An in-memory inbox; records outgoing mail instead of sending it."""
+
+    def __init__(self, inbox=()):
+        self.sent = []
+        self.inbox = {email["id"]: {**email, "unread": True} for email in inbox}
+        self._lock = threading.Lock()
+
+    def send_email(self, to: str, subject: str, body: str):
+        with self._lock:
+            self.sent.append({"to": to, "subject": subject, "body": body})
+            return {"success": True, "message_id": f"fake-{len(self.sent)}"}
+
+    def fetch_unread_page(self, max_results=25, page_token=None):
+        # Page tokens are offsets into the whole inbox, so marking mail read between pages skips nothing
+        with self._lock:
+            message_ids = list(self.inbox)
+            start = int(page_token or 0)
+            window = [self.inbox[message_id] for message_id in message_ids[start:start + max_results]]
+            end = start + max_results
+            return {
+                "emails": [dict(email) for email in window if email["unread"]],
+                "next_page_token": str(end) if end < len(message_ids) else None,
+                "estimate": sum(email["unread"] for email in self.inbox.values()),
+            }
+
+    def fetch_unread_emails(self, max_results=1):
+        return self.fetch_unread_page(max_results)["emails"]
+
+    def mark_many_as_read(self, message_ids):
+        with self._lock:
+            for message_id in message_ids:
+                self.inbox[message_id]["unread"] = False
+        return True
+
+    def mark_as_read(self, message_id: str):
+        return self.mark_many_as_read([message_id])
+
+    def unread_count(self) -> int:
+        return sum(email["unread"] for email in self.inbox.values())
+
+
+def make_inbox(count: int, templates: dict = None) -> list:
+    """count unread emails cycling through the templates, in the shape cron_job processes."""
+    templates = templates or load_templates()
+    names = sorted(templates)
+    emails = []
+    for i in range(count):
+        name = names[i % len(names)]
+        header, _, body = templates[name].partition("\n\n")
+        headers = dict(
+            line.split(":", 1) for line in header.splitlines() if ":" in line
+        )
+        emails.append({
+            "id": f"bench-{i:06d}",
+            "thread_id": f"bench-{i:06d}",
+            "subject": headers.get("Subject", "").strip(),
+            "from_email": headers.get("From", "").strip(),
+            "body": body,
+            "snippet": body[:100],
+            "template": name,
+        })
+    return emails
+
+
+def _parse_tool_content(text: str):
+    # JSON, a Python repr, or the compact encoding's JSON line followed by tables
+    for parse in (json.loads, ast.literal_eval, lambda t: json.loads(t.split("\n", 1)[0])):
+        try:
+            return parse(text)
+        except (ValueError, SyntaxError):
+            continue
+    return {}
+
+
+class ScriptedChatModel:
+    """Stands in for the tool-bound chat model on the template order emails.
+
+    After a fixed latency it takes the step the real model takes next: look up
+    the customer and products, place one bulk order, send the confirmation (or
+    an "Action Required" email), then answer. Each step is driven by the tool
+    results actually returned, so the tools, Express and Gmail fakes all run.
+    Usage is reported as roughly four characters per token.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, messages):
+        time.sleep(self.latency)
+        return self._step(messages)
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.latency)
+        return self._step(messages)
+
+    def _step(self, messages) -> AIMessage:
+        with self._lock:
+            self.calls += 1
+        query = next(m.content for m in messages if isinstance(m, HumanMessage))
+        sender = re.search(r"^From:\s*(\S+)", query, re.MULTILINE).group(1).lower()
+        script = ORDER_SCRIPTS.get(sender)
+
+        # Tool name and parsed result of every call made so far, in call order
+        names = {call["id"]: call["name"] for m in messages if isinstance(m, AIMessage) for call in m.tool_calls}
+        done = [
+            (names[m.tool_call_id], _parse_tool_content(m.content))
+            for m in messages if isinstance(m, ToolMessage)
+        ]
+        called = {name for name, _ in done}
+        step = sum(isinstance(m, AIMessage) for m in messages)
+
+        if script is None:
+            return self._reply(messages, "This does not look like an order email I can process.")
+        if not done:
+            return self._reply(messages, "", step, [("find_customer_by_email", {"customer_email": sender})] + [
+                ("get_product_by_id", {"product_id": item["product_id"]}) if item["product_id"]
+                else ("find_product", {"product_name": item["name"]})
+                for item in script
+            ])
+        if "send_gmail" in called:
+            return self._reply(messages, f"Processed the order email from {sender}.")
+
+        if "create_bulk_order" in called:
+            order = done[-1][1]
+            if order.get("success"):
+                order_id = order["order"]["id"]
+                lines = "\n".join(f"- {item['quantity']} x {item['name']}" for item in script)
+                return self._reply(messages, "", step, [("send_gmail", {
+                    "to": sender,
+                    "subject": f"Order Confirmation - Order #{order_id}",
+                    "body": f"Your order #{order_id} has been created:\n{lines}",
+                })])
+            return self._problem(messages, step, sender, [order.get("error", "Order could not be created.")])
+
+        customer, *products = [result for _, result in done[:len(script) + 1]]
+        problems = [] if customer.get("found") else [f"No customer account was found for {sender}."]
+        problems += [
+            f"Product '{item['name']}' was not found." for item, product in zip(script, products)
+            if not product.get("product")
+        ]
+        if problems:
+            return self._problem(messages, step, sender, problems)
+        return self._reply(messages, "", step, [("create_bulk_order", {
+            "customer_id": customer["customer"]["id"],
+            "items": [
+                {"product_id": product["product"]["id"], "quantity": item["quantity"]}
+                for item, product in zip(script, products)
+            ],
+        })])
+
+    def _problem(self, messages, step, sender, problems):
+        return self._reply(messages, "", step, [("send_gmail", {
+            "to": sender,
+            "subject": "Action Required - Issue With Your Order Request",
+            "body": "\n".join(problems),
+        })])
+
+    def _reply(self, messages, content, step=0, calls=()):
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        completion_tokens = max(len(content) // 4, 1) + 20 * len(calls)
+        return AIMessage(
+            content=content,
+            tool_calls=[
+                {"name": name, "args": args, "id": f"call_{step}_{i}", "type": "tool_call"}
+                for i, (name, args) in enumerate(calls)
+            ],
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        )
+
+
+def install_fakes(inbox=()):
+    """Route the Express client and send_gmail to fresh fakes; returns (api, gmail)."""
+    api = FakeExpressAPI()
+    gmail = FakeGmail(inbox)
+    express_client.request = api.handle
+    express_client.arequest = api.ahandle
+    tools.gmail_tools.send_email = gmail.send_email
+    catalog_cache.clear()
+    return api, gmail
+
+
+def install_gmail_inbox(gmail: FakeGmail):
+    """Point the cron job's Gmail reads and label changes at the fake inbox."""
+    import cron_job
+    cron_job.fetch_unread_page = gmail.fetch_unread_page
+    cron_job.fetch_unread_emails = gmail.fetch_unread_emails
+    cron_job.mark_many_as_read = gmail.mark_many_as_read
+    cron_job.mark_as_read = gmail.mark_as_read
+
+
+def isolate_caches():
+    """Turn the response caches off and point them at a throwaway file.
+
+    Runs must not replay each other's cached answers, and must not write fake
+    data into the real response_cache.db.
+    """
+    import config
+    import response_cache
+    config.LLM_CACHE_ENABLED = False
+    config.TOOL_CACHE_ENABLED = False
+    config.RESPONSE_CACHE_PATH = os.path.join(tempfile.mkdtemp(prefix="agent-bench-"), "response_cache.db")
+    response_cache.response_cache = response_cache.ResponseCache(
+        config.RESPONSE_CACHE_PATH, config.RESPONSE_CACHE_MAX_BYTES
+    )
+
+
+def use_estimated_tokens():
+    """Count tokens with context_window's character estimate instead of tiktoken.
+
+    tiktoken downloads its BPE file on first use, which an offline run cannot do.
+    """
+    import context_window
+    context_window.tiktoken = None
+    context_window._encoding = None
+
+
+def install_chat_model(model):
+    """Make mainAgent use model instead of the OpenAI chat model."""
+    import config
+    import mainAgent
+    # The agent runtime still builds (unused) OpenAI clients, which need some key
+    config.OPENAI_API_KEY = config.OPENAI_API_KEY or "offline-benchmark"
+    mainAgent.get_llm_with_tools = lambda profile=None: model
+
+
+def orders_for_message(api: FakeExpressAPI, message_id: str) -> set:
+    """Product IDs ordered while processing one Gmail message (via its idempotency keys)."""
+    return {
+        item["productId"]
+        for key, order in api.orders_by_key.items() if key.startswith(f"gmail:{message_id}:")
+        for item in order["items"]
+    }
+
+
+def ordered_products(api: FakeExpressAPI, email: str) -> set:
+    """Product IDs ordered so far by the customer with this email."""
+    customer_ids = {c["id"] for c in api.customers.values() if c["email"] == email}
+    return {
+        item["productId"]
+        for order in api.orders if order["customerId"] in customer_ids
+        for item in order["items"]
+    }
@@ -0,0 +1,123 @@
+"""End-to-end email pipeline throughput against local fakes (no OpenAI, Gmail or Postgres).
+
+Replays template/email*.txt through the cron job's batch sweep -> mainAgent ->
+tools -> send_gmail, with a scripted chat model that answers after a fixed
+latency. Reports emails/sec, per-email p50/p99 latency, memory allocated while
+running, and whether every email produced its expected order and a reply.
+The response caches are turned off so every email does the full work, and
+tokens are estimated from characters so nothing needs the network.
+
+Run from main-agent/:
+    python -m benchmarks.pipeline --emails 300 --latency 0.05 --workers 8
+    python -m benchmarks.pipeline --emails 300 --fast-path
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+from benchmarks.fakes import (
+    EXPECTED_ORDERS,
+    ScriptedChatModel,
+    install_chat_model,
+    install_fakes,
+    install_gmail_inbox,
+    isolate_caches,
+    use_estimated_tokens,
+    make_inbox,
+    orders_for_message,
+)
+import config
+import cron_job
+
+
+def _configure(args):
+    isolate_caches()
+    use_estimated_tokens()
+    config.AGENT_ENGINE = "loop"
+    config.FAST_PATH_ENABLED = args.fast_path
+    config.EMAIL_BATCH_MODE = True
+    config.EMAIL_WORKERS = args.workers
+    config.EMAIL_PAGE_SIZE = args.page_size
+    config.EMAIL_MAX_PER_RUN = args.emails
+
+
+def _timed_handler(latencies: list):
+    handle_email = cron_job.handle_email
+
+    def wrapper(email):
+        start = time.perf_counter()
+        try:
+            return handle_email(email)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper
+
+
+def run(args) -> dict:
+    _configure(args)
+    inbox = make_inbox(args.emails)
+    api, gmail = install_fakes(inbox)
+    install_gmail_inbox(gmail)
+    model = ScriptedChatModel(args.latency)
+    install_chat_model(model)
+
+    latencies = []
+    cron_job.handle_email = _timed_handler(latencies)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    cron_job.process_unread_emails_batch()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory() if args.trace_memory else (0, 0)
+    tracemalloc.stop()
+
+    correct = 0
+    for email in inbox:
+        sender = email["from_email"].lower()
+        replied = any(mail["to"].lower() == sender for mail in gmail.sent)
+        if orders_for_message(api, email["id"]) == EXPECTED_ORDERS[email["template"]] and replied:
+            correct += 1
+
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "emails": len(latencies),
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "p50": cuts[49],
+        "p99": cuts[98],
+        "llm_calls": model.calls / max(len(latencies), 1),
+        "express_requests": api.requests / max(len(latencies), 1),
+        "retained_kib": current / 1024 / max(len(latencies), 1),
+        "peak_mib": peak / 1024 / 1024,
+        "correct": f"{correct}/{len(inbox)}",
+        "unread": gmail.unread_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake model latency per step in seconds")
+    parser.add_argument("--workers", type=int, default=config.EMAIL_WORKERS)
+    parser.add_argument("--page-size", type=int, default=config.EMAIL_PAGE_SIZE)
+    parser.add_argument("--fast-path", action="store_true", help="let the rule-based fast path take template emails")
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false",
+                        help="skip tracemalloc, which slows the run down")
+    args = parser.parse_args()
+
+    stats = run(args)
+    print(
+        f"emails={stats['emails']} elapsed={stats['elapsed']:.2f}s "
+        f"throughput={stats['throughput']:.1f} emails/s "
+        f"p50={stats['p50'] * 1000:.0f}ms p99={stats['p99'] * 1000:.0f}ms"
+    )
+    print(
+        f"llm_calls/email={stats['llm_calls']:.1f} express_requests/email={stats['express_requests']:.1f} "
+        f"peak_memory={stats['peak_mib']:.1f}MiB retained/email={stats['retained_kib']:.1f}KiB"
+    )
+    print(f"correct={stats['correct']} unread_left={stats['unread']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Tokens the model reads per template email under each tool-result encoding.
+
+Runs every template email through mainAgent against the local fakes with the
+scripted chat model, once per TOOL_RESULT_ENCODING, and counts (with the same
+tokenizer as context_window) the tool-result tokens and the prompt tokens sent
+over all model steps. Also encodes one page of each list tool. Savings are
+relative to "repr", the original str(result) format.
+
+Run from main-agent/:
+    python -m benchmarks.tool_encoding
+"""
+import argparse
+import re
+from langchain_core.messages import ToolMessage
+from benchmarks.fakes import (
+    EXPECTED_ORDERS,
+    ScriptedChatModel,
+    install_chat_model,
+    install_fakes,
+    isolate_caches,
+    load_templates,
+    ordered_products,
+)
+from context_window import count_tokens
+from mainAgent import mainAgent
+from tool_encoding import ENCODERS, encode_tool_result
+from tools import get_all_customers, get_all_orders, get_all_products
+import config
+
+
+class CountingChatModel(ScriptedChatModel):
+    """The scripted model, also counting the tokens of every prompt it is sent."""
+
+    def __init__(self):
+        super().__init__()
+        self.prompt_tokens = 0
+        self.tool_tokens = 0
+
+    def _step(self, messages):
+        self.prompt_tokens += sum(count_tokens(str(m.content)) for m in messages)
+        # The last step sees every tool result, so this ends as the per-email total
+        self.tool_tokens = sum(count_tokens(m.content) for m in messages if isinstance(m, ToolMessage))
+        return super()._step(messages)
+
+
+def run_email(text: str, file_name: str) -> dict:
+    api, gmail = install_fakes()
+    model = CountingChatModel()
+    install_chat_model(model)
+    mainAgent(text, history=None)
+
+    sender = re.search(r"^From:\s*(\S+)", text, re.MULTILINE).group(1).lower()
+    replied = any(mail["to"].lower() == sender for mail in gmail.sent)
+    return {
+        "tool": model.tool_tokens,
+        "prompt": model.prompt_tokens,
+        "correct": ordered_products(api, sender) == EXPECTED_ORDERS.get(file_name) and replied,
+    }
+
+
+def list_tool_tokens(templates: dict) -> dict:
+    """Tokens for one page of each list tool, with a few orders placed first."""
+    for file_name, text in templates.items():
+        run_email(text, file_name)
+    pages = {
+        "get_all_products": get_all_products.invoke({}),
+        "get_all_customers": get_all_customers.invoke({}),
+        "get_all_orders": get_all_orders.invoke({}),
+    }
+    return {
+        name: {encoding: count_tokens(encode_tool_result(name, page, encoding)) for encoding in ENCODERS}
+        for name, page in pages.items()
+    }
+
+
+def _saved(value: int, baseline: int) -> str:
+    return f"{100 * (baseline - value) / baseline:.0f}%" if baseline else "-"
+
+
+def main():
+    argparse.ArgumentParser(description=__doc__.splitlines()[0]).parse_args()
+    isolate_caches()
+    config.FAST_PATH_ENABLED = False
+    config.AGENT_ENGINE = "loop"
+    templates = load_templates()
+
+    results = {}
+    for encoding in ENCODERS:
+        config.TOOL_RESULT_ENCODING = encoding
+        results[encoding] = {name: run_email(text, name) for name, text in templates.items()}
+
+    baseline = results["repr"]
+    print(f"{'encoding':<10}{'email':<12}{'tool tokens':>12}{'saved':>7}{'prompt tokens':>15}{'saved':>7}  correct")
+    for encoding, per_email in results.items():
+        for name, stats in per_email.items():
+            base = baseline[name]
+            print(
+                f"{encoding:<10}{name:<12}{stats['tool']:>12}{_saved(stats['tool'], base['tool']):>7}"
+                f"{stats['prompt']:>15}{_saved(stats['prompt'], base['prompt']):>7}  {stats['correct']}"
+            )
+        tool = sum(s["tool"] for s in per_email.values()) / len(per_email)
+        prompt = sum(s["prompt"] for s in per_email.values()) / len(per_email)
+        base_tool = sum(s["tool"] for s in baseline.values()) / len(baseline)
+        base_prompt = sum(s["prompt"] for s in baseline.values()) / len(baseline)
+        print(
+            f"{encoding:<10}{'mean/email':<12}{tool:>12.0f}{_saved(tool, base_tool):>7}"
+            f"{prompt:>15.0f}{_saved(prompt, base_prompt):>7}"
+        )
+
+    config.TOOL_RESULT_ENCODING = "repr"
+    print(f"\n{'list page':<20}" + "".join(f"{encoding:>10}" for encoding in ENCODERS))
+    for name, tokens in list_tool_tokens(templates).items():
+        print(f"{name:<20}" + "".join(f"{tokens[encoding]:>10}" for encoding in ENCODERS)
+              + f"  saved {_saved(tokens['compact'], tokens['repr'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,69 @@ load_dotenv()
 # OpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+# Pooled connections shared by every chat model of the agent runtime
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+# A replaced agent runtime's connection pools are closed this long after the swap
+RUNTIME_CLOSE_GRACE_SECONDS = float(os.getenv("RUNTIME_CLOSE_GRACE_SECONDS", "120"))
+
+# Agent
+# "loop" = multi-turn tool calling (mainAgent); "extract" = one structured call + Python (extractionAgent)
+AGENT_ENGINE = os.getenv("AGENT_ENGINE", "loop")
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "4"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+# Share of the budget kept verbatim after summarizing, so the next summary is several turns away
+HISTORY_KEEP_RATIO = float(os.getenv("HISTORY_KEEP_RATIO", "0.5"))
+MAX_TOOL_RESULT_TOKENS = int(os.getenv("MAX_TOOL_RESULT_TOKENS", "1500"))
+# How tool results are written for the model: "repr", "json" or "compact" (see tool_encoding.py)
+TOOL_RESULT_ENCODING = os.getenv("TOOL_RESULT_ENCODING", "compact")
+TOOL_RESULT_MAX_ROWS = int(os.getenv("TOOL_RESULT_MAX_ROWS", "50"))
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
+# Tool profiles (see tools.TOOL_PROFILES) bound for emails and for /chat
+EMAIL_TOOL_PROFILE = os.getenv("EMAIL_TOOL_PROFILE", "order-email")
+CHAT_TOOL_PROFILE = os.getenv("CHAT_TOOL_PROFILE", "admin")
+# Pick a narrower /chat profile from keywords in the message
+TOOL_INTENT_SELECTION = os.getenv("TOOL_INTENT_SELECTION", "false").lower() == "true"
+
+# Response cache for identical LLM steps and read-only tool calls
+RESPONSE_CACHE_PATH = os.getenv(
+    "RESPONSE_CACHE_PATH", os.path.join(os.path.dirname(__file__), "response_cache.db")
+)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+# Also cache model steps that call write tools (create_order, send_gmail, ...)
+LLM_CACHE_WRITE_STEPS = os.getenv("LLM_CACHE_WRITE_STEPS", "false").lower() == "true"
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "true").lower() == "true"
+TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", "60"))
+
+# Conversation store: "memory" (LRU only) or "sqlite" (LRU in front of a SQLite file)
+CONVERSATION_STORE = os.getenv("CONVERSATION_STORE", "memory")
+CONVERSATION_DB_PATH = os.getenv(
+    "CONVERSATION_DB_PATH", os.path.join(os.path.dirname(__file__), "conversations.db")
+)
+CONVERSATION_MAX_CACHED = int(os.getenv("CONVERSATION_MAX_CACHED", "1000"))
 
 # Express API
 EXPRESS_API_URL = os.getenv("EXPRESS_API_URL", "http://localhost:3000/api")
+EXPRESS_HTTP2 = os.getenv("EXPRESS_HTTP2", "false").lower() == "true"
+EXPRESS_MAX_CONNECTIONS = int(os.getenv("EXPRESS_MAX_CONNECTIONS", "20"))
+EXPRESS_MAX_KEEPALIVE = int(os.getenv("EXPRESS_MAX_KEEPALIVE", "10"))
+EXPRESS_KEEPALIVE_EXPIRY = float(os.getenv("EXPRESS_KEEPALIVE_EXPIRY", "30"))
+EXPRESS_TIMEOUT = float(os.getenv("EXPRESS_TIMEOUT", "10"))
+EXPRESS_CONNECT_TIMEOUT = float(os.getenv("EXPRESS_CONNECT_TIMEOUT", "5"))
+EXPRESS_MAX_RETRIES = int(os.getenv("EXPRESS_MAX_RETRIES", "2"))
+EXPRESS_RETRY_BACKOFF = float(os.getenv("EXPRESS_RETRY_BACKOFF", "0.2"))
+CUSTOMER_INDEX_TTL = float(os.getenv("CUSTOMER_INDEX_TTL", "300"))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "60"))
+PRODUCT_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", "256"))
+PRODUCT_SEARCH_TOP_K = int(os.getenv("PRODUCT_SEARCH_TOP_K", "5"))
+PRODUCT_SEARCH_MIN_SCORE = float(os.getenv("PRODUCT_SEARCH_MIN_SCORE", "0.3"))
+# A fuzzy hit only counts as the product asked for when it is this close and this far ahead of the next
+PRODUCT_MATCH_MIN_SCORE = float(os.getenv("PRODUCT_MATCH_MIN_SCORE", "0.8"))
+PRODUCT_MATCH_MIN_MARGIN = float(os.getenv("PRODUCT_MATCH_MIN_MARGIN", "0.15"))
+# Page size of the get_all_* tools; the model can ask for at most LIST_TOOL_MAX_LIMIT rows per call
+LIST_TOOL_DEFAULT_LIMIT = int(os.getenv("LIST_TOOL_DEFAULT_LIMIT", "20"))
+LIST_TOOL_MAX_LIMIT = int(os.getenv("LIST_TOOL_MAX_LIMIT", "50"))
 
 # SMTP
 SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
@@ -16,6 +76,36 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 
+# Email processing (cron job)
+EMAIL_POLL_MINUTES = int(os.getenv("EMAIL_POLL_MINUTES", "2"))
+EMAIL_BATCH_MODE = os.getenv("EMAIL_BATCH_MODE", "true").lower() == "true"
+EMAIL_PAGE_SIZE = int(os.getenv("EMAIL_PAGE_SIZE", "25"))
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "4"))
+EMAIL_MAX_PER_RUN = int(os.getenv("EMAIL_MAX_PER_RUN", "200"))
+# Rule-based handling of template-style order emails before falling back to the agent
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+# "poll" = unread sweep only; "history" = also sync new mail from Gmail history every few seconds
+EMAIL_SYNC_MODE = os.getenv("EMAIL_SYNC_MODE", "poll")
+EMAIL_HISTORY_POLL_SECONDS = int(os.getenv("EMAIL_HISTORY_POLL_SECONDS", "15"))
+# Optional Pub/Sub push: topic passed to users.watch, token expected on /gmail/push?token=
+GMAIL_PUSH_TOPIC = os.getenv("GMAIL_PUSH_TOPIC", "")
+GMAIL_PUSH_TOKEN = os.getenv("GMAIL_PUSH_TOKEN", "")
+# Durable queue: the scheduler only enqueues message ids and email_worker.py processes them
+EMAIL_QUEUE_ENABLED = os.getenv("EMAIL_QUEUE_ENABLED", "false").lower() == "true"
+EMAIL_QUEUE_PATH = os.getenv(
+    "EMAIL_QUEUE_PATH", os.path.join(os.path.dirname(__file__), "email_queue.db")
+)
+EMAIL_QUEUE_LEASE_SECONDS = int(os.getenv("EMAIL_QUEUE_LEASE_SECONDS", "300"))
+EMAIL_QUEUE_MAX_ATTEMPTS = int(os.getenv("EMAIL_QUEUE_MAX_ATTEMPTS", "5"))
+EMAIL_QUEUE_RETRY_BACKOFF = float(os.getenv("EMAIL_QUEUE_RETRY_BACKOFF", "30"))
+EMAIL_QUEUE_BATCH = int(os.getenv("EMAIL_QUEUE_BATCH", "8"))
+EMAIL_QUEUE_IDLE_SECONDS = float(os.getenv("EMAIL_QUEUE_IDLE_SECONDS", "5"))
+EMAIL_QUEUE_RETENTION_DAYS = int(os.getenv("EMAIL_QUEUE_RETENTION_DAYS", "7"))
+
 # Google OAuth2
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET", "")
+GMAIL_TOKEN_REFRESH_MARGIN = int(os.getenv("GMAIL_TOKEN_REFRESH_MARGIN", "300"))
+# Retries for messages.get calls that fail inside a batch with 429/5xx (backoff doubles each round)
+GMAIL_BATCH_RETRIES = int(os.getenv("GMAIL_BATCH_RETRIES", "2"))
+GMAIL_BATCH_RETRY_BACKOFF = float(os.getenv("GMAIL_BATCH_RETRY_BACKOFF", "1"))
@@ -0,0 +1,149 @@
+import logging
+from langchain_core.messages import HumanMessage, SystemMessage
+from agent_runtime import get_runtime
+import config
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken ships with langchain-openai, but fall back to an estimate
+    tiktoken = None
+
+SUMMARY_PROMPT = (
+    "Summarize the earlier part of this conversation between a user and an order "
+    "processing agent. Keep every customer, product and order ID, quantity, email "
+    "address and unresolved problem. Be brief."
+)
+
+logger = logging.getLogger("context_window")
+
+_encoding = None
+_encoding_failed = False
+
+
+def _load_encoding():
+    try:
+        return tiktoken.encoding_for_model(config.OPENAI_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def _get_encoding():
+    """The model's tiktoken encoding, or None to estimate from characters.
+
+    tiktoken downloads the BPE file on first use; if that fails (e.g. offline)
+    the estimate is used for the rest of the process instead of failing requests.
+    """
+    global _encoding, _encoding_failed
+    if _encoding is None and tiktoken is not None and not _encoding_failed:
+        try:
+            _encoding = _load_encoding()
+        except Exception as e:
+            _encoding_failed = True
+            logger.warning(f"Could not load the tiktoken encoding, estimating tokens from characters: {e}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def truncate_tool_result(text: str, max_tokens: int = None) -> str:
+    """Cut an oversized tool result down to max_tokens, marking what was dropped."""
+    max_tokens = max_tokens or config.MAX_TOOL_RESULT_TOKENS
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is None:
+        kept = text[:max_tokens * 4]
+    else:
+        kept = encoding.decode(encoding.encode(text)[:max_tokens])
+    return f"{kept}\n...[truncated {total - max_tokens} of {total} tokens]"
+
+
+def split_history(history: list, budget: int = None) -> tuple:
+    """Split history into (older, recent), where recent is the newest turns within budget
+    (HISTORY_TOKEN_BUDGET by default).
+
+    The latest turn is always kept, even if it alone exceeds the budget.
+    """
+    budget = budget or config.HISTORY_TOKEN_BUDGET
+    used = 0
+    cut = len(history)
+    while cut > 0:
+        used += count_tokens(history[cut - 1]["content"] or "")
+        if used > budget and cut < len(history):
+            break
+        cut -= 1
+    return history[:cut], history[cut:]
+
+
+def add_usage(usage: dict, message):
+    """Accumulate the token usage reported on an AIMessage."""
+    if getattr(message, "response_metadata", {}).get("cache_hit"):
+        usage["cache_hits"] += 1
+        return
+    metadata = getattr(message, "usage_metadata", None) or {}
+    usage["prompt_tokens"] += metadata.get("input_tokens", 0)
+    usage["completion_tokens"] += metadata.get("output_tokens", 0)
+    usage["total_tokens"] += metadata.get("total_tokens", 0)
+    usage["llm_calls"] += 1
+
+
+def new_usage() -> dict:
+    return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "llm_calls": 0, "cache_hits": 0}
+
+
+def _needs_summary(older: list) -> bool:
+    # A lone summary from an earlier request is already as compact as it gets
+    return bool(older) and not (len(older) == 1 and older[0]["role"] == "summary")
+
+
+def _plan_summary(history: list):
+    """Return (older, recent) to summarize now, or None while the history fits.
+
+    Nothing happens until the whole history (summary included) exceeds
+    HISTORY_TOKEN_BUDGET. Then only the newest turns within HISTORY_KEEP_RATIO
+    of the budget stay verbatim, leaving room for several more turns before
+    the next summary instead of one summary call per request.
+    """
+    if sum(count_tokens(turn["content"] or "") for turn in history) <= config.HISTORY_TOKEN_BUDGET:
+        return None
+    older, recent = split_history(history, max(int(config.HISTORY_TOKEN_BUDGET * config.HISTORY_KEEP_RATIO), 1))
+    if not _needs_summary(older):
+        return None
+    return older, recent
+
+
+def _summary_messages(older: list) -> list:
+    transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in older if turn["content"])
+    return [SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=transcript)]
+
+
+def _summarizer():
+    return get_runtime().summarizer
+
+
+def fit_history(history: list, usage: dict) -> list:
+    """Keep recent turns verbatim and replace older ones with a single summary turn."""
+    plan = _plan_summary(history)
+    if plan is None:
+        return history
+    older, recent = plan
+    summary = _summarizer().invoke(_summary_messages(older))
+    add_usage(usage, summary)
+    return [{"role": "summary", "content": summary.content}] + recent
+
+
+async def afit_history(history: list, usage: dict) -> list:
+    """Async version of fit_history."""
+    plan = _plan_summary(history)
+    if plan is None:
+        return history
+    older, recent = plan
+    summary = await _summarizer().ainvoke(_summary_messages(older))
+    add_usage(usage, summary)
+    return [{"role": "summary", "content": summary.content}] + recent
@@ -0,0 +1,81 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import config
+
+
+class SQLiteBackend:
+    """Durable conversation storage in a single SQLite table."""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "id TEXT PRIMARY KEY, history TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def get(self, conversation_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT history FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, conversation_id: str, history: list):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO conversations (id, history, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET history = excluded.history, updated_at = excluded.updated_at",
+                (conversation_id, json.dumps(history), time.time()),
+            )
+
+
+class ConversationStore:
+    """Conversation history keyed by conversation_id.
+
+    An in-memory LRU holds the most recent conversations; an optional backend
+    (e.g. SQLiteBackend) keeps them across restarts and LRU evictions.
+    """
+
+    def __init__(self, max_conversations: int, backend=None):
+        self.max_conversations = max_conversations
+        self.backend = backend
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str) -> list:
+        with self._lock:
+            if conversation_id in self._cache:
+                self._cache.move_to_end(conversation_id)
+                return self._cache[conversation_id]
+        history = self.backend.get(conversation_id) if self.backend else None
+        if history is not None:
+            self._remember(conversation_id, history)
+        return history or []
+
+    def save(self, conversation_id: str, history: list):
+        self._remember(conversation_id, history)
+        if self.backend:
+            self.backend.save(conversation_id, history)
+
+    def _remember(self, conversation_id: str, history: list):
+        with self._lock:
+            self._cache[conversation_id] = history
+            self._cache.move_to_end(conversation_id)
+            while len(self._cache) > self.max_conversations:
+                self._cache.popitem(last=False)
+
+
+def create_conversation_store() -> ConversationStore:
+    """Build the store selected by CONVERSATION_STORE ("memory" or "sqlite")."""
+    backend = None
+    if config.CONVERSATION_STORE == "sqlite":
+        backend = SQLiteBackend(config.CONVERSATION_DB_PATH)
+    return ConversationStore(config.CONVERSATION_MAX_CACHED, backend=backend)
+
+
+conversation_store = create_conversation_store()
@@ -1,16 +1,127 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial, wraps
 from apscheduler.schedulers.background import BackgroundScheduler
-from gmail_service import fetch_unread_emails, mark_as_read
+from gmail_service import (
+    HistoryExpiredError,
+    fetch_unread_by_ids,
+    fetch_unread_emails,
+    fetch_unread_page,
+    get_current_history_id,
+    list_added_message_ids,
+    list_unread_ids,
+    load_history_checkpoint,
+    mark_as_read,
+    mark_many_as_read,
+    save_history_checkpoint,
+    watch_inbox,
+)
 from mainAgent import mainAgent
+from extractionAgent import extractionAgent
+from fast_path import path_stats, record_path, run_fast_path
+from email_queue import email_queue
+from request_context import LOG_FORMAT, current_message_id, current_trace_id, new_trace_id
+from metrics import timed
+import config
 import logging
 
 logger = logging.getLogger("cron_job")
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
 
 scheduler = BackgroundScheduler()
 
+# Held by whichever email job is running (unread sweep or history sync)
+_run_lock = threading.Lock()
 
+
+def handle_email(email) -> dict:
+    """Run one email through the fast path or the agent and return the result. Raises on failure."""
+    formatted_query = (
+        f"From: {email['from_email']}\n"
+        f"Subject: {email['subject']}\n\n"
+        f"{email['body']}"
+    )
+
+    # Orders created while handling this email are keyed to its message ID
+    message_token = current_message_id.set(email["id"])
+    trace_token = current_trace_id.set(new_trace_id())
+    try:
+        logger.info(f"Processing email {email['id']} from {email['from_email']}: {email['subject']}")
+        timer = timed("agent_email_processing_seconds", path="llm_path")
+        with timer:
+            result = run_fast_path(email) if config.FAST_PATH_ENABLED else None
+            if result is not None:
+                timer.labels["path"] = "fast_path"
+            elif config.AGENT_ENGINE == "extract":
+                result = extractionAgent(query=formatted_query, from_email=email["from_email"])
+                if result is not None:
+                    timer.labels["path"] = "extract_path"
+            if result is None:
+                result = mainAgent(query=formatted_query, history=None, profile=config.EMAIL_TOOL_PROFILE)
+        record_path(timer.labels["path"])
+        logger.info(f"Agent response: {result.get('response', 'No response')[:200]}")
+    finally:
+        current_trace_id.reset(trace_token)
+        current_message_id.reset(message_token)
+    return result
+
+
+def process_email(email, mark_read=True) -> bool:
+    """Run one email through the agent and mark it read. Returns False on failure.
+
+    With mark_read=False the caller marks successful emails read in bulk.
+    """
+    try:
+        handle_email(email)
+
+        if mark_read:
+            mark_as_read(email["id"])
+            logger.info(f"Marked email {email['id']} as read.")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error processing email {email.get('id', 'unknown')}: {e}")
+        return False
+
+
+def _exclusive(job):
+    """Skip a run while another email job is running, so no email is processed twice."""
+    @wraps(job)
+    def wrapper():
+        if not _run_lock.acquire(blocking=False):
+            logger.info(f"{job.__name__}: another email job is running. Skipping.")
+            return
+        try:
+            return job()
+        finally:
+            _run_lock.release()
+    return wrapper
+
+
+def _process_batch(pool, emails, stats):
+    """Process emails on the pool, then mark the successful ones read in one call."""
+    done = []
+    for email, ok in zip(emails, pool.map(partial(process_email, mark_read=False), emails)):
+        stats["processed" if ok else "failed"] += 1
+        if ok:
+            done.append(email["id"])
+    try:
+        mark_many_as_read(done)
+        logger.info(f"Marked {len(done)} email(s) as read.")
+    except Exception as e:
+        logger.error(f"Failed to mark {len(done)} email(s) as read: {e}")
+
+
+@_exclusive
 def process_unread_emails():
     """Fetch unread emails from Gmail and process each through the agent."""
+    if config.EMAIL_QUEUE_ENABLED:
+        return enqueue_unread_emails()
+    if config.EMAIL_BATCH_MODE:
+        return process_unread_emails_batch()
+
     logger.info("Cron job: Checking for unread emails...")
 
     try:
@@ -29,38 +140,170 @@ def process_unread_emails():
     logger.info(f"Found {len(emails)} unread email(s). Processing...")
 
     for email in emails:
-        try:
-            formatted_query = (
-                f"From: {email['from_email']}\n"
-                f"Subject: {email['subject']}\n\n"
-                f"{email['body']}"
-            )
+        process_email(email)
 
-            logger.info(f"Processing email from {email['from_email']}: {email['subject']}")
 
-            result = mainAgent(query=formatted_query, history=None)
-            # result = {"response": "Agent response placeholder "} # Replace with actual agent call if needed
+def process_unread_emails_batch():
+    """Drain the unread backlog page by page through a bounded worker pool.
 
-            logger.info(f"Agent response: {result.get('response', 'No response')[:200]}")
+    Each page is processed by EMAIL_WORKERS threads before the next page is
+    fetched, up to EMAIL_MAX_PER_RUN emails per run. A failing email is logged
+    and left unread; it does not stop the rest of the batch.
+    """
+    logger.info("Cron job: Draining unread emails in batch mode...")
+    start = time.monotonic()
+    stats = {"fetched": 0, "processed": 0, "failed": 0, "backlog": 0}
+    seen = set()
+    page_token = None
 
-            mark_as_read(email["id"])
-            logger.info(f"Marked email {email['id']} as read.")
+    with ThreadPoolExecutor(max_workers=config.EMAIL_WORKERS, thread_name_prefix="email") as pool:
+        while stats["fetched"] < config.EMAIL_MAX_PER_RUN:
+            page_size = min(config.EMAIL_PAGE_SIZE, config.EMAIL_MAX_PER_RUN - stats["fetched"])
+            try:
+                page = fetch_unread_page(max_results=page_size, page_token=page_token)
+            except FileNotFoundError:
+                logger.warning("Gmail not authenticated. Skipping. Visit /auth/google to authenticate.")
+                return
+            except Exception as e:
+                logger.error(f"Failed to fetch emails: {e}")
+                break
+
+            if not stats["backlog"]:
+                stats["backlog"] = page["estimate"]
+            emails = [email for email in page["emails"] if email["id"] not in seen]
+            if not emails:
+                break
+            seen.update(email["id"] for email in emails)
+            stats["fetched"] += len(emails)
 
-        except Exception as e:
-            logger.error(f"Error processing email {email.get('id', 'unknown')}: {e}")
+            _process_batch(pool, emails, stats)
+
+            page_token = page["next_page_token"]
+            if not page_token:
+                break
+
+    elapsed = time.monotonic() - start
+    if not stats["fetched"]:
+        logger.info("No new unread emails found.")
+        return
+    logger.info(
+        f"Batch run: fetched={stats['fetched']} processed={stats['processed']} "
+        f"failed={stats['failed']} backlog_at_start={stats['backlog']} "
+        f"remaining_estimate={max(stats['backlog'] - stats['processed'], 0)} "
+        f"elapsed={elapsed:.1f}s throughput={stats['fetched'] / elapsed:.2f} emails/s "
+        f"paths={path_stats()}"
+    )
+
+
+def enqueue_unread_emails():
+    """Queue mode: add unread message ids to the email queue for email_worker.py."""
+    try:
+        message_ids = list_unread_ids(max_results=config.EMAIL_MAX_PER_RUN)
+    except FileNotFoundError:
+        logger.warning("Gmail not authenticated. Skipping. Visit /auth/google to authenticate.")
+        return
+    except Exception as e:
+        logger.error(f"Failed to list unread emails: {e}")
+        return
+
+    added = email_queue.enqueue(message_ids)
+    email_queue.purge_done(config.EMAIL_QUEUE_RETENTION_DAYS * 86400)
+    logger.info(f"Queued {added} new of {len(message_ids)} unread email(s). Queue: {email_queue.stats()}")
+
+
+@_exclusive
+def sync_new_emails():
+    """Process inbox mail added since the last history checkpoint.
+
+    An idle run costs a single users.history.list call. Mail that fails here
+    stays unread and is retried by the regular unread sweep.
+    """
+    try:
+        checkpoint = load_history_checkpoint()
+        if checkpoint is None:
+            save_history_checkpoint(get_current_history_id())
+            logger.info("History checkpoint initialised; existing unread mail is left to the unread sweep.")
+            return
+        message_ids, latest_history_id = list_added_message_ids(checkpoint)
+        if config.EMAIL_QUEUE_ENABLED:
+            # The worker skips ids that turn out to be read already
+            email_queue.enqueue(message_ids)
+            emails = []
+        else:
+            emails = fetch_unread_by_ids(message_ids) if message_ids else []
+    except FileNotFoundError:
+        logger.warning("Gmail not authenticated. Skipping. Visit /auth/google to authenticate.")
+        return
+    except HistoryExpiredError:
+        logger.warning("History checkpoint expired; resetting it. The unread sweep covers the gap.")
+        save_history_checkpoint(get_current_history_id())
+        return
+    except Exception as e:
+        logger.error(f"Failed to sync new emails: {e}")
+        return
+
+    if emails:
+        start = time.monotonic()
+        stats = {"fetched": len(emails), "processed": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=config.EMAIL_WORKERS, thread_name_prefix="email") as pool:
+            _process_batch(pool, emails, stats)
+        logger.info(
+            f"History sync: processed={stats['processed']} failed={stats['failed']} "
+            f"elapsed={time.monotonic() - start:.1f}s"
+        )
+
+    if latest_history_id != checkpoint:
+        save_history_checkpoint(latest_history_id)
+
+
+def trigger_history_sync():
+    """Run sync_new_emails as soon as possible (called by the Gmail push webhook)."""
+    job = scheduler.get_job("email_history_sync")
+    if job:
+        job.modify(next_run_time=datetime.now(scheduler.timezone))
+
+
+def renew_inbox_watch():
+    """Re-register the Gmail Pub/Sub watch; Gmail drops it after 7 days."""
+    try:
+        result = watch_inbox(config.GMAIL_PUSH_TOPIC)
+        logger.info(f"Gmail push watch active until {result.get('expiration')}.")
+    except Exception as e:
+        logger.error(f"Failed to register Gmail push watch: {e}")
 
 
 def start_scheduler():
-    """Start the background scheduler (runs every 5 minutes)."""
+    """Start the background scheduler (runs every EMAIL_POLL_MINUTES minutes)."""
     scheduler.add_job(
         process_unread_emails,
         trigger="interval",
-        minutes=2,
+        minutes=config.EMAIL_POLL_MINUTES,
         id="email_processor",
         replace_existing=True,
+        max_instances=1,
+        coalesce=True,
     )
+    if config.EMAIL_SYNC_MODE == "history":
+        scheduler.add_job(
+            sync_new_emails,
+            trigger="interval",
+            seconds=config.EMAIL_HISTORY_POLL_SECONDS,
+            id="email_history_sync",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+        if config.GMAIL_PUSH_TOPIC:
+            scheduler.add_job(
+                renew_inbox_watch,
+                trigger="interval",
+                days=1,
+                id="gmail_watch_renewal",
+                replace_existing=True,
+                next_run_time=datetime.now(scheduler.timezone),
+            )
     scheduler.start()
-    logger.info("Email processing scheduler started (runs every 5 minutes).")
+    logger.info(f"Email processing scheduler started (runs every {config.EMAIL_POLL_MINUTES} minutes).")
 
 
 def stop_scheduler():
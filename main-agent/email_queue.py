@@ -0,0 +1,164 @@
+import sqlite3
+import threading
+import time
+import config
+
+
+class EmailQueue:
+    """Durable SQLite queue of Gmail message ids waiting for agent processing.
+
+    A job moves queued -> leased -> handled -> done. Handled means the agent is
+    finished but Gmail has not yet marked the message read; only done jobs are
+    purged, since a still-unread message would be listed and processed again.
+    A failed job goes back to queued with an exponential backoff delay, and
+    becomes dead after max_attempts. A lease that expires (its worker crashed)
+    makes the job available again. Several worker processes can share one
+    queue file.
+    """
+
+    def __init__(self, path: str, lease_seconds: int, max_attempts: int, retry_backoff: float):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        # Autocommit mode so lease() can take the write lock with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "message_id TEXT PRIMARY KEY, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "available_at REAL NOT NULL, lease_until REAL, worker TEXT, last_error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, available_at)")
+
+    def enqueue(self, message_ids) -> int:
+        """Add message ids; ids already known (in any state) are ignored. Returns how many were added."""
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (message_id, status, available_at, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?)",
+                [(message_id, now, now, now) for message_id in message_ids],
+            )
+            return self._conn.total_changes - before
+
+    def lease(self, worker: str, limit: int) -> list:
+        """Claim up to limit due jobs for worker and return their message ids."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose worker kept crashing on them don't get another lease
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'dead', last_error = 'lease expired', updated_at = ? "
+                    "WHERE status = 'leased' AND lease_until <= ? AND attempts >= ?",
+                    (now, now, self.max_attempts),
+                )
+                message_ids = [row[0] for row in self._conn.execute(
+                    "SELECT message_id FROM jobs "
+                    "WHERE (status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_until <= ?) "
+                    "ORDER BY available_at LIMIT ?",
+                    (now, now, limit),
+                )]
+                self._conn.executemany(
+                    "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_until = ?, "
+                    "worker = ?, updated_at = ? WHERE message_id = ?",
+                    [(now + self.lease_seconds, worker, now, message_id) for message_id in message_ids],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return message_ids
+
+    def mark_handled(self, message_id: str):
+        """The agent finished this job; it becomes done once Gmail has it marked read."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'handled', lease_until = NULL, last_error = NULL, updated_at = ? "
+                "WHERE message_id = ?",
+                (time.time(), message_id),
+            )
+
+    def handled(self, limit: int = 1000) -> list:
+        """Message ids that were processed but still need to be marked read."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT message_id FROM jobs WHERE status = 'handled' ORDER BY updated_at LIMIT ?", (limit,)
+            )]
+
+    def complete(self, message_id: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', lease_until = NULL, last_error = NULL, updated_at = ? "
+                "WHERE message_id = ?",
+                (time.time(), message_id),
+            )
+
+    def fail(self, message_id: str, worker: str, error: str) -> str:
+        """Schedule a retry with backoff, or dead-letter the job. Returns the new status.
+
+        Ignored (returns "lost") when the lease has since passed to another worker.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts FROM jobs WHERE message_id = ? AND status = 'leased' AND worker = ?",
+                (message_id, worker),
+            ).fetchone()
+            if row is None:
+                return "lost"
+            attempts = row[0]
+            status = "dead" if attempts >= self.max_attempts else "queued"
+            delay = self.retry_backoff * 2 ** (attempts - 1)
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, lease_until = NULL, last_error = ?, updated_at = ? "
+                "WHERE message_id = ?",
+                (status, now + delay, error[:1000], now, message_id),
+            )
+            return status
+
+    def requeue_dead(self) -> int:
+        """Give every dead-lettered job a fresh set of attempts. Returns how many were requeued."""
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, updated_at = ? "
+                "WHERE status = 'dead'",
+                (now, now),
+            ).rowcount
+
+    def purge_done(self, older_than: float) -> int:
+        """Forget jobs finished more than older_than seconds ago."""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE status = 'done' AND updated_at < ?", (time.time() - older_than,)
+            ).rowcount
+
+    def dead_letters(self, limit: int = 50) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message_id, attempts, last_error, updated_at FROM jobs "
+                "WHERE status = 'dead' ORDER BY updated_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {"message_id": message_id, "attempts": attempts, "error": error, "updated_at": updated_at}
+            for message_id, attempts, error, updated_at in rows
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in ("queued", "leased", "handled", "done", "dead")}
+
+
+email_queue = EmailQueue(
+    config.EMAIL_QUEUE_PATH,
+    lease_seconds=config.EMAIL_QUEUE_LEASE_SECONDS,
+    max_attempts=config.EMAIL_QUEUE_MAX_ATTEMPTS,
+    retry_backoff=config.EMAIL_QUEUE_RETRY_BACKOFF,
+)
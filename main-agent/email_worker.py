@@ -0,0 +1,124 @@
+"""Email queue worker: leases queued Gmail message ids and runs them through the agent.
+
+Start one or more next to the API when EMAIL_QUEUE_ENABLED=true. Run from main-agent/:
+    python email_worker.py --threads 4
+    python email_worker.py --stats
+    python email_worker.py --requeue-dead
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email_queue import email_queue
+from gmail_service import fetch_emails_by_ids, mark_many_as_read
+from cron_job import handle_email
+from request_context import LOG_FORMAT
+import config
+
+logger = logging.getLogger("email_worker")
+logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+_stop = threading.Event()
+
+
+def _handle(email):
+    """Return None on success or the error message."""
+    try:
+        handle_email(email)
+        return None
+    except Exception as e:
+        logger.error(f"Error processing email {email['id']}: {e}")
+        return str(e) or type(e).__name__
+
+
+def process_leased(pool, worker: str, message_ids: list):
+    """Process one leased batch: fetch, run the agent, then complete, retry or dead-letter each job."""
+    try:
+        emails_by_id = fetch_emails_by_ids(message_ids)
+    except Exception as e:
+        logger.error(f"Failed to fetch {len(message_ids)} leased email(s): {e}")
+        for message_id in message_ids:
+            email_queue.fail(message_id, worker, f"fetch failed: {e}")
+        return
+
+    emails = []
+    for message_id in message_ids:
+        email = emails_by_id.get(message_id)
+        if email is None:
+            email_queue.fail(message_id, worker, "fetch failed")
+        elif not email["unread"]:
+            # Read in the meantime (by a person, or by the inline sweep before queue mode)
+            email_queue.complete(message_id)
+        else:
+            emails.append(email)
+
+    handled = []
+    for email, error in zip(emails, pool.map(_handle, emails)):
+        if error is None:
+            email_queue.mark_handled(email["id"])
+            handled.append(email["id"])
+        else:
+            status = email_queue.fail(email["id"], worker, error)
+            logger.info(f"Email {email['id']} -> {status}")
+    mark_read(handled)
+
+
+def mark_read(message_ids: list):
+    """Mark handled emails read in Gmail, then complete their jobs.
+
+    On failure the jobs stay "handled": they are not processed again, are not
+    purged, and the read-mark is retried on the next cycle.
+    """
+    if not message_ids:
+        return
+    try:
+        mark_many_as_read(message_ids)
+    except Exception as e:
+        logger.error(f"Failed to mark {len(message_ids)} email(s) as read, will retry: {e}")
+        return
+    for message_id in message_ids:
+        email_queue.complete(message_id)
+
+
+def run_worker(threads: int):
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Email worker {worker} started with {threads} thread(s).")
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="email") as pool:
+        while not _stop.is_set():
+            # Read-marks that failed in an earlier cycle (or before a restart)
+            mark_read(email_queue.handled())
+            message_ids = email_queue.lease(worker, config.EMAIL_QUEUE_BATCH)
+            if not message_ids:
+                _stop.wait(config.EMAIL_QUEUE_IDLE_SECONDS)
+                continue
+            process_leased(pool, worker, message_ids)
+    logger.info(f"Email worker {worker} stopped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=config.EMAIL_WORKERS)
+    parser.add_argument("--stats", action="store_true", help="print queue counts and dead letters, then exit")
+    parser.add_argument("--requeue-dead", action="store_true", help="retry every dead-lettered email, then exit")
+    args = parser.parse_args()
+
+    if args.stats:
+        print(email_queue.stats())
+        for job in email_queue.dead_letters():
+            print(f"dead {job['message_id']} attempts={job['attempts']} error={job['error']}")
+        return
+    if args.requeue_dead:
+        print(f"Requeued {email_queue.requeue_dead()} email(s).")
+        return
+
+    # Finish the current batch, then exit
+    signal.signal(signal.SIGTERM, lambda *_: _stop.set())
+    signal.signal(signal.SIGINT, lambda *_: _stop.set())
+    run_worker(args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import asyncio
+import random
+import re
+import threading
+import time
+import httpx
+from metrics import inc, observe
+import config
+
+# Methods that are safe to resend when the connection drops or the server is briefly unavailable
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE"}
+RETRY_STATUS_CODES = {502, 503, 504}
+
+_client = None
+_async_client = None
+_lock = threading.Lock()
+
+
+def _client_options():
+    """Shared pool, timeout and protocol settings for the Express API clients."""
+    return {
+        "base_url": config.EXPRESS_API_URL,
+        "http2": config.EXPRESS_HTTP2,
+        "limits": httpx.Limits(
+            max_connections=config.EXPRESS_MAX_CONNECTIONS,
+            max_keepalive_connections=config.EXPRESS_MAX_KEEPALIVE,
+            keepalive_expiry=config.EXPRESS_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(config.EXPRESS_TIMEOUT, connect=config.EXPRESS_CONNECT_TIMEOUT),
+    }
+
+
+def get_client() -> httpx.Client:
+    """Return the process-wide pooled sync client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = httpx.Client(**_client_options())
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled async client, creating it on first use."""
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(**_client_options())
+    return _async_client
+
+
+def open_clients():
+    """Create both clients up front (called from the FastAPI lifespan)."""
+    get_client()
+    get_async_client()
+
+
+async def close_clients():
+    """Close both clients and release their pooled connections."""
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def _retryable(method: str, kwargs: dict) -> bool:
+    """Idempotent methods, plus writes the server de-duplicates by Idempotency-Key."""
+    return method.upper() in IDEMPOTENT_METHODS or "Idempotency-Key" in (kwargs.get("headers") or {})
+
+
+def _should_retry(retryable: bool, attempt: int, response=None) -> bool:
+    if attempt >= config.EXPRESS_MAX_RETRIES or not retryable:
+        return False
+    return response is None or response.status_code in RETRY_STATUS_CODES
+
+
+def _route(path: str) -> str:
+    """Metric label for a path: numeric IDs collapsed so /products/7 and /products/8 share a series."""
+    return re.sub(r"/\d+(?=/|$)", "/:id", path.split("?", 1)[0])
+
+
+def _record(method: str, path: str, start: float, attempt: int, response=None):
+    status = str(response.status_code) if response is not None else "error"
+    observe("agent_express_request_seconds", time.perf_counter() - start,
+            method=method.upper(), route=_route(path), status=status)
+    if attempt:
+        inc("agent_express_retries_total", attempt, method=method.upper(), route=_route(path))
+
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with jitter: 0.2s, 0.4s, 0.8s... by default."""
+    delay = config.EXPRESS_RETRY_BACKOFF * (2 ** attempt)
+    return delay + random.uniform(0, delay / 2)
+
+
+def request(method: str, path: str, **kwargs) -> httpx.Response:
+    """Send a request to the Express API over the pooled sync client.
+
+    Idempotent requests (and those carrying an Idempotency-Key header) are
+    retried with backoff on transport errors and 502/503/504.
+    """
+    retryable = _retryable(method, kwargs)
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            response = get_client().request(method, path, **kwargs)
+        except httpx.TransportError:
+            if not _should_retry(retryable, attempt):
+                _record(method, path, start, attempt)
+                raise
+        else:
+            if not _should_retry(retryable, attempt, response):
+                _record(method, path, start, attempt, response)
+                return response
+        time.sleep(_backoff(attempt))
+        attempt += 1
+
+
+async def arequest(method: str, path: str, **kwargs) -> httpx.Response:
+    """Async counterpart of request() over the pooled async client."""
+    retryable = _retryable(method, kwargs)
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            response = await get_async_client().request(method, path, **kwargs)
+        except httpx.TransportError:
+            if not _should_retry(retryable, attempt):
+                _record(method, path, start, attempt)
+                raise
+        else:
+            if not _should_retry(retryable, attempt, response):
+                _record(method, path, start, attempt, response)
+                return response
+        await asyncio.sleep(_backoff(attempt))
+        attempt += 1
@@ -0,0 +1,79 @@
+import asyncio
+from email.utils import parseaddr
+from langchain_core.messages import HumanMessage, SystemMessage
+from prompts.extraction_prompt import EXTRACTION_PROMPT
+from model.schema import OrderExtraction
+from agent_runtime import get_runtime
+from order_pipeline import place_orders, report_problems, resolve_order
+from context_window import add_usage, new_usage
+
+
+def get_extractor():
+    """Return the shared LLM instance that yields an OrderExtraction plus the raw message (for usage)."""
+    return get_runtime().extractor
+
+
+def _execute(extraction: OrderExtraction, from_email: str = None):
+    """Run lookups, order creation and the reply email deterministically from an extraction.
+
+    The reply goes to from_email (the email's From header) when given, else to the
+    address the model extracted. Returns None when there is no usable sender address
+    or the order API rejects the order, so the agent can handle the email.
+    """
+    to = parseaddr(from_email or extraction.customer_email or "")[1]
+    if "@" not in to:
+        return None
+
+    items = [
+        {"product_id": item.product_id, "name": item.product_name, "quantity": item.quantity}
+        for item in extraction.items
+    ]
+    problems = list(extraction.missing_info)
+    if not items:
+        problems.append("The email does not list any products to order.")
+        return report_problems(to, problems)
+
+    resolved = resolve_order(to, items)
+    problems += resolved["problems"]
+    if problems:
+        return report_problems(to, problems)
+    return place_orders(resolved["customer"], items, resolved["products"], to)
+
+
+def _finish(result: dict, usage: dict):
+    add_usage(usage, result["raw"])
+    extraction = result["parsed"]
+    if extraction is None or not extraction.is_order:
+        return None
+    return extraction
+
+
+def extractionAgent(query: str, from_email: str = None):
+    """Process an order email with one structured LLM call instead of the tool loop.
+
+    from_email is the email's From header, when the caller has it. Returns the
+    result dict, or None when the input isn't an order email, has no sender
+    address or the order was rejected, so the caller can fall back to mainAgent.
+    """
+    usage = new_usage()
+    messages = [SystemMessage(content=EXTRACTION_PROMPT), HumanMessage(content=query)]
+    extraction = _finish(get_extractor().invoke(messages), usage)
+    if extraction is None:
+        return None
+    result = _execute(extraction, from_email)
+    if result is None:
+        return None
+    return {**result, "extraction": extraction.model_dump(), "usage": usage}
+
+
+async def aextractionAgent(query: str, from_email: str = None):
+    """Async version of extractionAgent; the deterministic steps run in a worker thread."""
+    usage = new_usage()
+    messages = [SystemMessage(content=EXTRACTION_PROMPT), HumanMessage(content=query)]
+    extraction = _finish(await get_extractor().ainvoke(messages), usage)
+    if extraction is None:
+        return None
+    result = await asyncio.to_thread(_execute, extraction, from_email)
+    if result is None:
+        return None
+    return {**result, "extraction": extraction.model_dump(), "usage": usage}
@@ -0,0 +1,72 @@
+import re
+import threading
+from email.utils import parseaddr
+from order_pipeline import place_orders, resolve_order
+
+# "- 2 Laptops ( productId : 1 )", "3x Wireless Keyboard (product id: 4)". The quantity must
+# open a line or list item, or follow "to order", so "Order #12 Laptop" or "hired 2 new
+# developers and 3 Laptops" are not read as quantities.
+ITEM_RE = re.compile(
+    r"(?:^[ \t]*(?:[-*\u2022]|\d+[.)])?[ \t]*|\bto[ \t]+order[ \t]+)"
+    r"(\d+)[ \t]*x?[ \t]+([A-Za-z][A-Za-z0-9 \-]{0,60}?)\s*\(\s*product\s*_?id\s*[:=#]?\s*(\d+)\s*\)",
+    re.IGNORECASE | re.MULTILINE,
+)
+PRODUCT_ID_RE = re.compile(r"product\s*_?id", re.IGNORECASE)
+
+_stats = {"fast_path": 0, "extract_path": 0, "llm_path": 0}
+_stats_lock = threading.Lock()
+
+
+def record_path(path: str):
+    """Count an email as handled by the "fast_path", "extract_path" or "llm_path"."""
+    with _stats_lock:
+        _stats[path] += 1
+
+
+def path_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def parse_order_email(email: dict):
+    """Extract sender, product IDs and quantities from an order email.
+
+    Returns {"from_email", "items": [{"product_id", "quantity", "name"}]} or None
+    when the email is not confidently machine-readable: no sender, no items, or a
+    productId mention that no item pattern accounts for.
+    """
+    from_email = parseaddr(email.get("from_email", ""))[1].strip().lower()
+    if "@" not in from_email:
+        return None
+
+    body = email.get("body", "")
+    items = [
+        {"product_id": int(product_id), "quantity": int(quantity), "name": name.strip()}
+        for quantity, name, product_id in ITEM_RE.findall(body)
+    ]
+    if not items or len(items) != len(PRODUCT_ID_RE.findall(body)):
+        return None
+    if any(item["quantity"] < 1 for item in items):
+        return None
+
+    return {"from_email": from_email, "items": items}
+
+
+def run_fast_path(email: dict):
+    """Process a well-formed order email without the LLM.
+
+    Runs find customer -> verify products -> create orders -> send confirmation.
+    Returns the agent-style result dict, or None to hand the email to the agent
+    (anything it cannot parse or verify, or an order the API rejects). Nothing is
+    written unless the customer and every product check out first.
+    """
+    parsed = parse_order_email(email)
+    if parsed is None:
+        return None
+
+    resolved = resolve_order(parsed["from_email"], parsed["items"])
+    if resolved["problems"]:
+        # Let the agent decide how to explain the problem to the sender
+        return None
+
+    return place_orders(resolved["customer"], parsed["items"], resolved["products"], parsed["from_email"])
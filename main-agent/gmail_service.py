@@ -1,11 +1,20 @@
 import os
+import json
 import base64
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from email.mime.text import MIMEText
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from metrics import inc, timed
 import config
 
+logger = logging.getLogger("gmail_service")
+
 SCOPES = [
     "https://www.googleapis.com/auth/gmail.readonly",
     "https://www.googleapis.com/auth/gmail.send",
@@ -13,68 +22,287 @@ SCOPES = [
 ]
 
 TOKEN_PATH = os.path.join(os.path.dirname(__file__), "token.json")
+HISTORY_PATH = os.path.join(os.path.dirname(__file__), "gmail_history.json")
 
+# Gmail accepts up to 100 calls per batch but throttles large ones; 50 is the recommended size
+BATCH_SIZE = 50
+BATCH_MODIFY_LIMIT = 1000
 
-def get_gmail_service():
-    """Build and return an authenticated Gmail API service object."""
+# Partial responses: only what the agent reads from each message
+FULL_FIELDS = "id,threadId,labelIds,snippet,payload(mimeType,headers,body/data,parts)"
+METADATA_FIELDS = "id,threadId,payload/headers"
+
+
+class HistoryExpiredError(Exception):
+    """The stored historyId is too old for users.history.list (Gmail returns 404)."""
+
+
+_creds = None
+_creds_mtime = None
+_creds_lock = threading.Lock()
+_local = threading.local()
+
+
+def _utcnow():
+    # google-auth stores expiry as a naive UTC datetime
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _get_credentials():
+    """Return process-wide credentials, refreshing them shortly before they expire.
+
+    token.json is re-read only when its mtime changes (e.g. after /auth/google).
+    """
+    global _creds, _creds_mtime
     if not os.path.exists(TOKEN_PATH):
         raise FileNotFoundError(
             "token.json not found. Please authenticate via /auth/google first."
         )
 
-    creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+    with _creds_lock:
+        mtime = os.path.getmtime(TOKEN_PATH)
+        if _creds is None or mtime != _creds_mtime:
+            _creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+            _creds_mtime = mtime
 
-    if creds and creds.expired and creds.refresh_token:
-        creds.refresh(Request())
-        with open(TOKEN_PATH, "w") as f:
-            f.write(creds.to_json())
+        margin = timedelta(seconds=config.GMAIL_TOKEN_REFRESH_MARGIN)
+        expiring = _creds.expiry is not None and _creds.expiry - _utcnow() < margin
+        if _creds.refresh_token and (expiring or not _creds.valid):
+            _creds.refresh(Request())
+            with open(TOKEN_PATH, "w") as f:
+                f.write(_creds.to_json())
+            _creds_mtime = os.path.getmtime(TOKEN_PATH)
 
-    return build("gmail", "v1", credentials=creds)
+        return _creds
+
+
+def get_gmail_service():
+    """Return an authenticated Gmail API service object.
+
+    The service is cached per thread (its HTTP transport is not thread-safe) and
+    built from the bundled static discovery document, so no network round trip.
+    """
+    creds = _get_credentials()
+    if getattr(_local, "creds", None) is not creds:
+        _local.service = build(
+            "gmail", "v1", credentials=creds, static_discovery=True, cache_discovery=False
+        )
+        _local.creds = creds
+    return _local.service
 
 
 def fetch_unread_emails(max_results=1):
     """Fetch unread emails from Gmail inbox."""
+    return fetch_unread_page(max_results)["emails"]
+
+
+@timed("agent_gmail_request_seconds", op="fetch_unread_page")
+def fetch_unread_page(max_results=25, page_token=None):
+    """Fetch one page of unread inbox emails.
+
+    Returns {"emails": [...], "next_page_token": str | None, "estimate": int},
+    where estimate is Gmail's resultSizeEstimate for the whole unread query.
+    """
     service = get_gmail_service()
 
-    results = service.users().messages().list(
-        userId="me",
-        q="is:unread label:inbox",
-        maxResults=max_results,
-    ).execute()
+    params = {"userId": "me", "q": "is:unread label:inbox", "maxResults": max_results}
+    if page_token:
+        params["pageToken"] = page_token
+    results = service.users().messages().list(**params).execute()
 
+    page = {
+        "emails": [],
+        "next_page_token": results.get("nextPageToken"),
+        "estimate": results.get("resultSizeEstimate", 0),
+    }
     messages = results.get("messages", [])
     if not messages:
-        return []
+        return page
 
-    emails = []
+    messages_by_id = get_messages([msg["id"] for msg in messages], service=service)
     for msg in messages:
-        email_data = service.users().messages().get(
-            userId="me", id=msg["id"], format="full"
-        ).execute()
+        email_data = messages_by_id.get(msg["id"])
+        if email_data is None:
+            # Failed inside the batch; it stays unread and is picked up next run
+            continue
+        page["emails"].append(_to_email(email_data))
+
+    return page
+
+
+def fetch_unread_by_ids(message_ids):
+    """Fetch the given messages, keeping only those still unread in the inbox."""
+    emails_by_id = fetch_emails_by_ids(message_ids)
+    return [
+        emails_by_id[message_id]
+        for message_id in message_ids
+        if message_id in emails_by_id and emails_by_id[message_id]["unread"]
+    ]
+
+
+def fetch_emails_by_ids(message_ids):
+    """Fetch the given messages as {message_id: email}.
 
-        headers = email_data.get("payload", {}).get("headers", [])
-        subject = ""
-        from_email = ""
-        for header in headers:
-            if header["name"].lower() == "subject":
-                subject = header["value"]
-            elif header["name"].lower() == "from":
-                from_email = header["value"]
+    Each email carries an "unread" flag (still unread in the inbox); ids whose
+    fetch failed are left out.
+    """
+    messages_by_id = get_messages(list(message_ids))
+    return {
+        message_id: {**_to_email(message), "unread": {"UNREAD", "INBOX"} <= set(message.get("labelIds", []))}
+        for message_id, message in messages_by_id.items()
+    }
 
-        body = _extract_body(email_data.get("payload", {}))
 
-        emails.append({
-            "id": msg["id"],
-            "thread_id": email_data.get("threadId", ""),
-            "subject": subject,
-            "from_email": from_email,
-            "body": body,
-            "snippet": email_data.get("snippet", ""),
-        })
+@timed("agent_gmail_request_seconds", op="list_unread_ids")
+def list_unread_ids(max_results=500):
+    """List the ids of unread inbox messages without fetching them."""
+    service = get_gmail_service()
+    params = {"userId": "me", "q": "is:unread label:inbox", "maxResults": min(max_results, 500)}
+    message_ids = []
+    while len(message_ids) < max_results:
+        results = service.users().messages().list(**params).execute()
+        message_ids.extend(msg["id"] for msg in results.get("messages", []))
+        if not results.get("nextPageToken"):
+            break
+        params["pageToken"] = results["nextPageToken"]
+    return message_ids[:max_results]
+
+
+@timed("agent_gmail_request_seconds", op="get_profile")
+def get_current_history_id():
+    """Return the mailbox's current historyId (the starting point for incremental sync)."""
+    service = get_gmail_service()
+    return service.users().getProfile(userId="me").execute()["historyId"]
+
+
+@timed("agent_gmail_request_seconds", op="history_list")
+def list_added_message_ids(start_history_id):
+    """List inbox messages added since start_history_id via users.history.list.
+
+    Returns (message_ids, latest_history_id). Raises HistoryExpiredError when
+    Gmail no longer has history that far back.
+    """
+    service = get_gmail_service()
+    params = {
+        "userId": "me",
+        "startHistoryId": start_history_id,
+        "historyTypes": ["messageAdded"],
+        "labelId": "INBOX",
+    }
+    message_ids = []
+    latest_history_id = start_history_id
+
+    while True:
+        try:
+            results = service.users().history().list(**params).execute()
+        except HttpError as e:
+            if e.resp.status == 404:
+                raise HistoryExpiredError(f"historyId {start_history_id} is no longer available") from e
+            raise
 
-    return emails
+        for record in results.get("history", []):
+            for added in record.get("messagesAdded", []):
+                message_id = added["message"]["id"]
+                if message_id not in message_ids:
+                    message_ids.append(message_id)
+        latest_history_id = results.get("historyId", latest_history_id)
 
+        if not results.get("nextPageToken"):
+            return message_ids, latest_history_id
+        params["pageToken"] = results["nextPageToken"]
 
+
+def load_history_checkpoint():
+    """Return the persisted historyId, or None if incremental sync hasn't started."""
+    if not os.path.exists(HISTORY_PATH):
+        return None
+    with open(HISTORY_PATH) as f:
+        return json.load(f).get("historyId")
+
+
+def save_history_checkpoint(history_id):
+    """Persist the historyId atomically so a crash never leaves a half-written file."""
+    tmp_path = f"{HISTORY_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"historyId": str(history_id)}, f)
+    os.replace(tmp_path, HISTORY_PATH)
+
+
+@timed("agent_gmail_request_seconds", op="watch")
+def watch_inbox(topic_name):
+    """Ask Gmail to publish inbox changes to a Pub/Sub topic (expires after 7 days)."""
+    service = get_gmail_service()
+    return service.users().watch(
+        userId="me",
+        body={"topicName": topic_name, "labelIds": ["INBOX"], "labelFilterBehavior": "INCLUDE"},
+    ).execute()
+
+
+def _error_status(exception):
+    """HTTP status of a failed batch sub-request, or None for a network error."""
+    status = getattr(getattr(exception, "resp", None), "status", None)
+    return int(status) if status is not None else None
+
+
+def _retryable(status) -> bool:
+    return status is None or status == 429 or status >= 500
+
+
+def _batch_get(service, message_ids, results, message_format, fields, params) -> dict:
+    """Run one round of batched messages.get calls; returns {message_id: exception} for failures."""
+    failed = {}
+
+    def _collect(request_id, response, exception):
+        if exception is None:
+            results[request_id] = response
+        else:
+            failed[request_id] = exception
+
+    for start in range(0, len(message_ids), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=_collect)
+        for message_id in message_ids[start:start + BATCH_SIZE]:
+            batch.add(service.users().messages().get(
+                userId="me", id=message_id, format=message_format, fields=fields, **params
+            ), request_id=message_id)
+        batch.execute()
+    return failed
+
+
+@timed("agent_gmail_request_seconds", op="get_messages")
+def get_messages(message_ids, message_format="full", service=None, **params):
+    """Fetch many messages through Gmail batch HTTP requests.
+
+    Returns {message_id: message} for the messages that were fetched. Sub-requests
+    that fail with 429, 5xx or a network error are retried in a fresh batch up to
+    GMAIL_BATCH_RETRIES times; ids that still fail are logged and left out. Only
+    the fields the agent reads are requested.
+    """
+    service = service or get_gmail_service()
+    fields = FULL_FIELDS if message_format == "full" else METADATA_FIELDS
+    results = {}
+    pending = list(dict.fromkeys(message_ids))
+
+    for attempt in range(config.GMAIL_BATCH_RETRIES + 1):
+        if attempt:
+            time.sleep(config.GMAIL_BATCH_RETRY_BACKOFF * 2 ** (attempt - 1))
+        failed = _batch_get(service, pending, results, message_format, fields, params)
+
+        pending = []
+        for message_id, exception in failed.items():
+            status = _error_status(exception)
+            inc("agent_gmail_batch_errors_total", status=status or "network")
+            if _retryable(status) and attempt < config.GMAIL_BATCH_RETRIES:
+                pending.append(message_id)
+            else:
+                logger.warning(f"Could not fetch Gmail message {message_id} ({status or 'network'}): {exception}")
+        if not pending:
+            break
+        logger.info(f"Retrying {len(pending)} Gmail message fetch(es)")
+
+    return results
+
+
+@timed("agent_gmail_request_seconds", op="send")
 def send_email(to: str, subject: str, body: str):
     """Send an email via Gmail API."""
     service = get_gmail_service()
@@ -91,6 +319,7 @@ def send_email(to: str, subject: str, body: str):
     return {"success": True, "message_id": result.get("id", "")}
 
 
+@timed("agent_gmail_request_seconds", op="mark_read")
 def mark_as_read(message_id: str):
     """Mark a Gmail message as read by removing the UNREAD label."""
     service = get_gmail_service()
@@ -104,6 +333,41 @@ def mark_as_read(message_id: str):
     return True
 
 
+@timed("agent_gmail_request_seconds", op="batch_modify")
+def mark_many_as_read(message_ids):
+    """Mark many Gmail messages as read with batchModify (one call per 1000 ids)."""
+    if not message_ids:
+        return True
+    service = get_gmail_service()
+
+    for start in range(0, len(message_ids), BATCH_MODIFY_LIMIT):
+        service.users().messages().batchModify(
+            userId="me",
+            body={"ids": message_ids[start:start + BATCH_MODIFY_LIMIT], "removeLabelIds": ["UNREAD"]},
+        ).execute()
+
+    return True
+
+
+def _to_email(email_data):
+    """Convert a Gmail message resource into the dict the cron job processes."""
+    headers = _parse_headers(email_data)
+    return {
+        "id": email_data["id"],
+        "thread_id": email_data.get("threadId", ""),
+        "subject": headers.get("subject", ""),
+        "from_email": headers.get("from", ""),
+        "body": _extract_body(email_data.get("payload", {})),
+        "snippet": email_data.get("snippet", ""),
+    }
+
+
+def _parse_headers(message):
+    """Return the message headers as a dict keyed by lower-cased header name."""
+    headers = message.get("payload", {}).get("headers", [])
+    return {header["name"].lower(): header["value"] for header in headers}
+
+
 def _extract_body(payload):
     """Extract plain text body from email payload."""
     # Single-part message
@@ -1,21 +1,67 @@
+import json
+import logging
+import time
+import uuid
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from mainAgent import mainAgent
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from mainAgent import amainAgent, astreamAgent
+from tools import TOOL_PROFILES, select_profile
+from extractionAgent import aextractionAgent
 from auth_routes import router as auth_router
+from push_routes import router as push_router
 from cron_job import start_scheduler, stop_scheduler
+import express_client
+from agent_runtime import close_runtime, get_runtime, reload_runtime
+import config
+from conversation_store import conversation_store
+from tools.product_cache import catalog_cache
+from response_cache import response_cache
+from fast_path import path_stats
+from email_queue import email_queue
+from request_context import current_trace_id, new_trace_id
+import metrics
+
+logger = logging.getLogger("main")
 
 
 @asynccontextmanager
 async def lifespan(app):
+    express_client.open_clients()
+    get_runtime()
     start_scheduler()
     yield
     stop_scheduler()
+    await close_runtime()
+    await express_client.close_clients()
 
 
 app = FastAPI(lifespan=lifespan)
 
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Give each request a trace ID (or adopt the caller's X-Request-ID) for logs, and time it."""
+    trace_id = request.headers.get("X-Request-ID") or new_trace_id()
+    token = current_trace_id.set(trace_id)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        current_trace_id.reset(token)
+    route = request.scope.get("route")
+    metrics.observe(
+        "agent_http_request_seconds", time.perf_counter() - start,
+        route=route.path if route else "unmatched", status=str(response.status_code),
+    )
+    response.headers["X-Trace-ID"] = trace_id
+    return response
+
+
 # Register OAuth2 routes
 app.include_router(auth_router)
+# Gmail Pub/Sub push notifications
+app.include_router(push_router)
 
 
 @app.get("/")
@@ -23,12 +69,119 @@ def hello():
     return {"message": "fast api app is running"}
 
 
+@app.get("/cache/stats")
+def cache_stats():
+    return {"products": catalog_cache.stats(), "responses": response_cache.stats()}
+
+
+@app.post("/agent/reload")
+def agent_reload():
+    """Rebuild the bound models and tool registry, e.g. after changing a tool."""
+    runtime = reload_runtime()
+    return {"model": config.OPENAI_MODEL, "tools": sorted(runtime.tool_map)}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus text exposition of this process's latency histograms and counters."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/email/stats")
+def email_stats():
+    return path_stats()
+
+
+@app.get("/email/queue")
+def email_queue_stats():
+    return {"enabled": config.EMAIL_QUEUE_ENABLED, **email_queue.stats(), "dead_letters": email_queue.dead_letters()}
+
+
+def _tool_profile(data: dict, query: str) -> str:
+    """The request's "profile" if valid, else an intent-selected or the configured default profile."""
+    if data.get("profile") in TOOL_PROFILES:
+        return data["profile"]
+    if config.TOOL_INTENT_SELECTION:
+        return select_profile(query)
+    return config.CHAT_TOOL_PROFILE
+
+
+def _load_conversation(data: dict) -> tuple:
+    """Return (conversation_id, history) for a chat request body.
+
+    Server-side history is kept only for a conversation_id the client sent, or
+    a new one it asked for with "new_conversation": true. Otherwise the id is
+    None and nothing is stored; the client passes "history" itself.
+    """
+    conversation_id = data.get("conversation_id")
+    if conversation_id:
+        # Server-side history: the client only sends the new message
+        return conversation_id, conversation_store.get(conversation_id)
+    if data.get("new_conversation"):
+        return str(uuid.uuid4()), []
+    return None, data.get("history", None)
+
+
 @app.post("/chat")
 async def chat_endpoint(request: Request):
     data = await request.json()
-    query = data.get("query", "")
-    history = data.get("history", None)
+    query = data.get("query") or data.get("message", "")
+    conversation_id, history = _load_conversation(data)
+    profile = _tool_profile(data, query)
 
-    response = mainAgent(query, history) or {"response": f"Received your query: {query}"}
-    print("Response:", response)
-    return response
+    response = None
+    if (data.get("engine") or config.AGENT_ENGINE) == "extract":
+        response = await aextractionAgent(query)
+        if response is not None:
+            response["history"] = (history or []) + [
+                {"role": "user", "content": query},
+                {"role": "assistant", "content": response["response"]},
+            ]
+    if response is None:
+        response = await amainAgent(query, history, profile) or {"response": f"Received your query: {query}"}
+    logger.info(f"Response: {response.get('response', '')[:200]}")
+
+    if conversation_id is None:
+        return response
+    conversation_store.save(conversation_id, response.get("history", []))
+    return {
+        "response": response["response"],
+        "conversation_id": conversation_id,
+        "usage": response.get("usage"),
+    }
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: Request):
+    """Same as /chat, but streams tokens and tool-call progress as Server-Sent Events."""
+    data = await request.json()
+    query = data.get("query") or data.get("message", "")
+    conversation_id, history = _load_conversation(data)
+    profile = _tool_profile(data, query)
+
+    async def events():
+        try:
+            async for event in astreamAgent(query, history, profile):
+                if event["event"] == "done":
+                    done = {"event": "done", "response": event["response"], "usage": event["usage"]}
+                    if conversation_id is None:
+                        # Stateless: the client keeps the history
+                        done["history"] = event["history"]
+                    else:
+                        conversation_store.save(conversation_id, event["history"])
+                        done["conversation_id"] = conversation_id
+                    event = done
+                yield _sse(event)
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            yield _sse({"event": "error", "error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,26 +1,31 @@
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage
 from prompts.system_prompt import SYSTEM_PROMPT
-from langchain_openai import ChatOpenAI
 import config
-from tools import ALL_TOOLS
+from tools import SERIAL_TOOLS
+from agent_runtime import get_runtime
+from metrics import observe
+from response_cache import acached_llm_invoke, cached_llm_invoke, cached_tool_result, store_tool_result
+from context_window import add_usage, afit_history, fit_history, new_usage
+from tool_encoding import encode_tool_result
 
+logger = logging.getLogger("mainAgent")
 
+# Shared pool for running independent tool calls of one turn side by side
+_tool_executor = ThreadPoolExecutor(max_workers=config.TOOL_CONCURRENCY, thread_name_prefix="tool")
 
-def get_llm_with_tools():
-    """Create LLM instance with tools bound"""
-    llm = ChatOpenAI(
-        model=config.OPENAI_MODEL,
-        temperature=0,
-        api_key=config.OPENAI_API_KEY,
-    )
-    return llm.bind_tools(ALL_TOOLS)
 
+def get_llm_with_tools(profile: str = None):
+    """Return the shared LLM instance with the profile's tools bound (all tools by default)"""
+    return get_runtime().profile(profile).llm
 
-def mainAgent(query: str, history: list = None) -> dict:
-    """
-    query: user input string
-    history: list of dicts, each with {"role": "user"|"assistant", "content": ...}
-    """
+
+def _build_messages(query: str, history: list = None) -> list:
+    """Convert the client-supplied history plus the new query into LangChain messages."""
     messages = [SystemMessage(content=SYSTEM_PROMPT)]
     if history:
         for turn in history:
@@ -28,40 +33,19 @@ def mainAgent(query: str, history: list = None) -> dict:
                 messages.append(HumanMessage(content=turn["content"]))
             elif turn["role"] == "assistant":
                 messages.append(AIMessage(content=turn["content"]))
+            elif turn["role"] == "summary":
+                messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{turn['content']}"))
     messages.append(HumanMessage(content=query))
+    return messages
 
-    llm = get_llm_with_tools()
-    tool_map = {t.name: t for t in ALL_TOOLS}
-    tools_used = []
-    max_iterations = 10
 
-    for i in range(max_iterations):
-        response = llm.invoke(messages)
-        messages.append(response)
-        if not response.tool_calls:
-            break
-        for tool_call in response.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-            print(f"[Tool Call] {tool_name}({tool_args})")
-            tool_fn = tool_map.get(tool_name)
-            if not tool_fn:
-                result = f"Error: Tool '{tool_name}' not found"
-            else:
-                try:
-                    result = tool_fn.invoke(tool_args)
-                except Exception as e:
-                    result = f"Error: {str(e)}"
-            tools_used.append({"tool": tool_name, "args": tool_args, "result": result})
-            messages.append(ToolMessage(
-                content=str(result),
-                tool_call_id=tool_call["id"],
-            ))
-
-    # Build new history for next turn
+def _build_result(messages: list, response, usage: dict) -> dict:
+    """Build the endpoint payload, including the new history for the next turn."""
     new_history = []
-    for m in messages:
-        if isinstance(m, HumanMessage):
+    for m in messages[1:]:
+        if isinstance(m, SystemMessage):
+            new_history.append({"role": "summary", "content": m.content.split("\n", 1)[-1]})
+        elif isinstance(m, HumanMessage):
             new_history.append({"role": "user", "content": m.content})
         elif isinstance(m, AIMessage):
             new_history.append({"role": "assistant", "content": m.content})
@@ -69,4 +53,218 @@ def mainAgent(query: str, history: list = None) -> dict:
     return {
         "response": response.content,
         "history": new_history,
-    }
\ No newline at end of file
+        "usage": usage,
+    }
+
+
+def _tool_batches(tool_calls: list) -> list:
+    """Group a turn's tool calls into batches that may run concurrently.
+
+    Consecutive read-only calls share a batch; a tool listed in SERIAL_TOOLS
+    always gets a batch of its own, so writes keep the order the model chose.
+    """
+    batches = []
+    for tool_call in tool_calls:
+        if tool_call["name"] in SERIAL_TOOLS or not batches or batches[-1][-1]["name"] in SERIAL_TOOLS:
+            batches.append([tool_call])
+        else:
+            batches[-1].append(tool_call)
+    return batches
+
+
+def _tool_failed(result) -> bool:
+    """An "Error..." string, or a result dict with success or found set to False."""
+    if isinstance(result, str):
+        return result.startswith("Error")
+    return isinstance(result, dict) and (result.get("success") is False or result.get("found") is False)
+
+
+def _record_tool(tool_name: str, start: float, result, status: str = None):
+    """Log a finished tool call and observe its latency."""
+    elapsed = time.perf_counter() - start
+    if status is None:
+        status = "error" if _tool_failed(result) else "ok"
+    observe("agent_tool_call_seconds", elapsed, tool=tool_name, status=status)
+    logger.info(f"[Tool Done] {tool_name} status={status} elapsed={elapsed * 1000:.0f}ms")
+
+
+def _run_tool(tool_map: dict, tool_call: dict):
+    tool_name = tool_call["name"]
+    tool_args = tool_call["args"]
+    logger.info(f"[Tool Call] {tool_name}({tool_args})")
+    tool_fn = tool_map.get(tool_name)
+    if not tool_fn:
+        return f"Error: Tool '{tool_name}' not found"
+    start = time.perf_counter()
+    key, cached = cached_tool_result(tool_name, tool_args)
+    if cached is not None:
+        _record_tool(tool_name, start, cached, status="cached")
+        return cached
+    try:
+        result = tool_fn.invoke(tool_args)
+    except Exception as e:
+        result = f"Error: {str(e)}"
+        _record_tool(tool_name, start, result)
+        return result
+    _record_tool(tool_name, start, result)
+    store_tool_result(tool_name, key, result)
+    return result
+
+
+async def _arun_tool(tool_map: dict, tool_call: dict, semaphore: asyncio.Semaphore):
+    tool_name = tool_call["name"]
+    tool_args = tool_call["args"]
+    logger.info(f"[Tool Call] {tool_name}({tool_args})")
+    tool_fn = tool_map.get(tool_name)
+    if not tool_fn:
+        return f"Error: Tool '{tool_name}' not found"
+    start = time.perf_counter()
+    key, cached = cached_tool_result(tool_name, tool_args)
+    if cached is not None:
+        _record_tool(tool_name, start, cached, status="cached")
+        return cached
+    async with semaphore:
+        try:
+            result = await tool_fn.ainvoke(tool_args)
+        except Exception as e:
+            result = f"Error: {str(e)}"
+            _record_tool(tool_name, start, result)
+            return result
+    _record_tool(tool_name, start, result)
+    store_tool_result(tool_name, key, result)
+    return result
+
+
+def _execute_tool_calls(tool_map: dict, tool_calls: list) -> list:
+    """Run a turn's tool calls on the shared thread pool; results keep tool_calls order."""
+    # Pool threads don't inherit context variables (e.g. the current Gmail message ID)
+    context = contextvars.copy_context()
+    results = []
+    for batch in _tool_batches(tool_calls):
+        if len(batch) == 1:
+            results.append(_run_tool(tool_map, batch[0]))
+        else:
+            results.extend(_tool_executor.map(
+                lambda call: context.copy().run(_run_tool, tool_map, call), batch
+            ))
+    return results
+
+
+async def _aexecute_tool_calls(tool_map: dict, tool_calls: list) -> list:
+    """Async counterpart of _execute_tool_calls using asyncio.gather."""
+    semaphore = asyncio.Semaphore(config.TOOL_CONCURRENCY)
+    results = []
+    for batch in _tool_batches(tool_calls):
+        results.extend(await asyncio.gather(
+            *[_arun_tool(tool_map, call, semaphore) for call in batch]
+        ))
+    return results
+
+
+def _append_tool_results(messages: list, tools_used: list, tool_calls: list, results: list):
+    for tool_call, result in zip(tool_calls, results):
+        tools_used.append({"tool": tool_call["name"], "args": tool_call["args"], "result": result})
+        messages.append(ToolMessage(
+            content=encode_tool_result(tool_call["name"], result),
+            tool_call_id=tool_call["id"],
+        ))
+
+
+def mainAgent(query: str, history: list = None, profile: str = None) -> dict:
+    """
+    query: user input string
+    history: list of dicts, each with {"role": "user"|"assistant", "content": ...}
+    profile: name in tools.TOOL_PROFILES limiting which tools are bound; None binds all
+    """
+    usage = new_usage()
+    messages = _build_messages(query, fit_history(history or [], usage))
+    llm = get_llm_with_tools(profile)
+    tool_map = get_runtime().profile(profile).tool_map
+    tools_used = []
+    max_iterations = 10
+
+    for i in range(max_iterations):
+        response = cached_llm_invoke(llm, messages)
+        add_usage(usage, response)
+        messages.append(response)
+        if not response.tool_calls:
+            break
+        results = _execute_tool_calls(tool_map, response.tool_calls)
+        _append_tool_results(messages, tools_used, response.tool_calls, results)
+
+    return _build_result(messages, response, usage)
+
+
+async def amainAgent(query: str, history: list = None, profile: str = None) -> dict:
+    """Async version of mainAgent.
+
+    Uses ``ainvoke`` for the model and the tools so a slow OpenAI or Express
+    round trip yields the event loop instead of blocking every other request.
+    """
+    usage = new_usage()
+    messages = _build_messages(query, await afit_history(history or [], usage))
+    llm = get_llm_with_tools(profile)
+    tool_map = get_runtime().profile(profile).tool_map
+    tools_used = []
+    max_iterations = 10
+
+    for i in range(max_iterations):
+        response = await acached_llm_invoke(llm, messages)
+        add_usage(usage, response)
+        messages.append(response)
+        if not response.tool_calls:
+            break
+        results = await _aexecute_tool_calls(tool_map, response.tool_calls)
+        _append_tool_results(messages, tools_used, response.tool_calls, results)
+
+    return _build_result(messages, response, usage)
+
+
+async def _astream_tool_batch(tool_map: dict, batch: list, semaphore: asyncio.Semaphore, results: dict):
+    """Run one batch of tool calls, yielding a tool_end event as each one finishes."""
+    async def run(call):
+        return call, await _arun_tool(tool_map, call, semaphore)
+
+    for finished in asyncio.as_completed([run(call) for call in batch]):
+        call, result = await finished
+        results[call["id"]] = result
+        yield {"event": "tool_end", "id": call["id"], "tool": call["name"], "success": not _tool_failed(result)}
+
+
+async def astreamAgent(query: str, history: list = None, profile: str = None):
+    """Streaming version of amainAgent.
+
+    Yields ``token`` events with model output as it arrives, ``tool_start`` /
+    ``tool_end`` events around each tool call and a final ``done`` event carrying
+    the same payload amainAgent returns. Model steps are not served from the
+    response cache, since a cached step has nothing to stream.
+    """
+    usage = new_usage()
+    messages = _build_messages(query, await afit_history(history or [], usage))
+    llm = get_llm_with_tools(profile)
+    tool_map = get_runtime().profile(profile).tool_map
+    semaphore = asyncio.Semaphore(config.TOOL_CONCURRENCY)
+    tools_used = []
+    max_iterations = 10
+
+    for i in range(max_iterations):
+        response = None
+        async for chunk in llm.astream(messages):
+            response = chunk if response is None else response + chunk
+            if chunk.content:
+                yield {"event": "token", "content": chunk.content}
+        add_usage(usage, response)
+        messages.append(response)
+        if not response.tool_calls:
+            break
+
+        results = {}
+        for batch in _tool_batches(response.tool_calls):
+            for call in batch:
+                yield {"event": "tool_start", "id": call["id"], "tool": call["name"], "args": call["args"]}
+            async for event in _astream_tool_batch(tool_map, batch, semaphore, results):
+                yield event
+        ordered = [results[call["id"]] for call in response.tool_calls]
+        _append_tool_results(messages, tools_used, response.tool_calls, ordered)
+
+    yield {"event": "done", **_build_result(messages, response, usage)}
@@ -0,0 +1,135 @@
+"""In-process latency histograms and counters, rendered in the Prometheus text format.
+
+Each process keeps its own registry; GET /metrics on the API serves the API
+process (chat requests and, unless the email queue is enabled, email processing).
+"""
+import bisect
+import functools
+import threading
+import time
+
+# Seconds; covers everything from a cached lookup to a slow multi-step LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+METRIC_HELP = {
+    "agent_llm_request_seconds": "Latency of chat model calls",
+    "agent_llm_tokens_total": "Tokens reported by the chat model",
+    "agent_llm_cache_hits_total": "Model steps served from the response cache",
+    "agent_tool_call_seconds": "Latency of agent tool calls",
+    "agent_gmail_request_seconds": "Latency of Gmail API operations",
+    "agent_gmail_batch_errors_total": "Gmail batch sub-requests that failed, by HTTP status",
+    "agent_express_request_seconds": "Latency of Express API requests, including retries",
+    "agent_express_retries_total": "Express API requests that were retried",
+    "agent_email_processing_seconds": "Time to handle one email end to end",
+    "agent_http_request_seconds": "Latency of FastAPI requests",
+}
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class Registry:
+    """Thread-safe store of labelled histograms and counters."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+registry = Registry()
+observe = registry.observe
+inc = registry.inc
+
+
+class timed:
+    """Observe the wall time of a block in a histogram, labelled status="ok" or "error".
+
+    Works as a context manager or as a decorator for sync functions:
+        with timed("agent_tool_call_seconds", tool=name): ...
+        @timed("agent_gmail_request_seconds", op="send")
+    """
+
+    def __init__(self, name: str, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        status = "error" if exc_type else "ok"
+        observe(self.name, time.perf_counter() - self.start, **self.labels, status=status)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # A fresh timer per call, so concurrent calls don't share a start time
+            with timed(self.name, **self.labels):
+                return func(*args, **kwargs)
+        return wrapper
@@ -1,6 +1,23 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 class ChatRequest(BaseModel):
     message: str
+    # When set, /chat loads and stores history server-side under this id
     conversation_id: Optional[str] = None
+
+
+class ExtractedOrderItem(BaseModel):
+    product_id: Optional[int] = Field(None, description="Product ID written in the email (e.g. 'productId : 1'), if any")
+    product_name: str = Field(description="Product name exactly as written in the email")
+    quantity: int = Field(1, description="Requested quantity")
+
+
+class OrderExtraction(BaseModel):
+    is_order: bool = Field(description="True if the email asks to order products")
+    customer_email: Optional[str] = Field(None, description="Email address from the From header")
+    customer_name: Optional[str] = None
+    phone: Optional[str] = None
+    shipping_address: Optional[str] = None
+    items: List[ExtractedOrderItem] = []
+    missing_info: List[str] = Field([], description="Information required to place the order that the email lacks")
@@ -0,0 +1,116 @@
+import logging
+from tools import create_bulk_order, find_customer_by_email, find_product, get_product_by_id, send_gmail
+from tools.product_search import same_name, similarity
+import config
+
+logger = logging.getLogger("order_pipeline")
+
+
+def _is_named(name: str, product: dict) -> bool:
+    """Whether a looked-up product is the one named, not a look-alike the sender should confirm."""
+    return same_name(name, product["name"]) or similarity(name, product["name"]) >= config.PRODUCT_MATCH_MIN_SCORE
+
+
+def resolve_order(from_email: str, items: list) -> dict:
+    """Look up the customer and every requested product without writing anything.
+
+    items: [{"product_id": int | None, "name": str, "quantity": int}]
+    Returns {"customer", "products", "problems"}; problems is empty when the
+    order can be placed as requested.
+    """
+    problems = []
+    customer = find_customer_by_email.invoke({"customer_email": from_email})
+    if not customer.get("found"):
+        problems.append(f"No customer account was found for {from_email}.")
+
+    products = []
+    for item in items:
+        if item.get("product_id"):
+            result = get_product_by_id.invoke({"product_id": item["product_id"]})
+            if not result.get("success"):
+                problems.append(f"Product ID {item['product_id']} ({item['name']}) does not exist.")
+                continue
+            product = result["product"]
+            # The name must be the catalog name (case, punctuation and plurals aside), not just similar
+            if item.get("name") and not same_name(item["name"], product["name"]):
+                problems.append(
+                    f"Product ID {item['product_id']} is '{product['name']}', "
+                    f"which does not match '{item['name']}'."
+                )
+                continue
+        else:
+            result = find_product.invoke({"product_name": item["name"]})
+            product = result.get("product") if result.get("found") else None
+            if product is None or not _is_named(item["name"], product):
+                similar = [candidate["name"] for candidate in result.get("candidates", [])[:3]]
+                problems.append(
+                    f"We could not find a product called '{item['name']}'."
+                    + (f" Did you mean: {', '.join(similar)}?" if similar else "")
+                )
+                continue
+        products.append(product)
+
+    return {"customer": customer.get("customer"), "products": products, "problems": problems}
+
+
+def _send_reply(to: str, subject: str, body: str):
+    """Send a reply to the sender; raises so the email is retried rather than marked read."""
+    result = send_gmail.invoke({"to": to, "subject": subject, "body": body})
+    if not result.get("success"):
+        raise RuntimeError(f"Could not send '{subject}' to {to}: {result.get('error')}")
+
+
+def place_orders(customer: dict, items: list, products: list, to: str):
+    """Create a single order for every product and email a confirmation to the sender.
+
+    Returns None when the order is rejected (out of stock, missing product, API
+    error) so the caller can hand the email to the agent, which explains the
+    problem to the sender. Raises if the confirmation cannot be sent; the order
+    is idempotent, so a retry of the email does not place it twice.
+    """
+    result = create_bulk_order.invoke({
+        "customer_id": customer["id"],
+        "items": [
+            {"product_id": product["id"], "quantity": item["quantity"]}
+            for item, product in zip(items, products)
+        ],
+    })
+    if not result.get("success"):
+        logger.error(f"Order for customer {customer['id']} failed: {result.get('error')}")
+        return None
+
+    order_id = result["order"]["id"]
+    orders = [
+        {"order_id": order_id, "product_name": product["name"], "quantity": item["quantity"]}
+        for item, product in zip(items, products)
+    ]
+    _send_reply(to, f"Order Confirmation - Order #{order_id}", _confirmation_body(orders))
+    return {"response": f"Created order #{order_id} for {to}.", "orders": orders}
+
+
+def report_problems(to: str, problems: list) -> dict:
+    """Tell the sender why their order could not be placed. Raises if the email cannot be sent."""
+    _send_reply(
+        to,
+        "Action Required - Issue With Your Order Request",
+        "Hi,\n\n"
+        "We could not process your order request because of the following:\n\n"
+        + "\n".join(f"- {problem}" for problem in problems)
+        + "\n\nPlease verify the details and reply to this email with corrections.\n\n"
+        "Best regards,\n"
+        "Order Processing Team",
+    )
+    return {"response": "Order not created: " + " ".join(problems), "orders": []}
+
+
+def _confirmation_body(orders: list) -> str:
+    order_ids = ", ".join(f"#{order_id}" for order_id in dict.fromkeys(order["order_id"] for order in orders))
+    lines = "\n".join(f"- {order['quantity']} x {order['product_name']}" for order in orders)
+    return (
+        "Hi,\n\n"
+        f"Thank you for your order. We have received it and created order {order_ids} with the following items:\n\n"
+        f"{lines}\n\n"
+        "We will let you know once it ships.\n\n"
+        "Best regards,\n"
+        "Order Processing Team"
+    )
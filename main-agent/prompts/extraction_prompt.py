@@ -0,0 +1,11 @@
+EXTRACTION_PROMPT = """You extract order details from customer emails for an e-commerce company.
+
+Read the email and fill in the schema:
+- is_order: true only if the sender asks to buy products.
+- customer_email: the address in the From header (not addresses mentioned in the body).
+- customer_name, phone, shipping_address: as written in the email, if present.
+- items: one entry per product, with the productId if the email gives one, the product name exactly as written, and the quantity (default 1).
+- missing_info: anything required to place the order that the email does not contain.
+
+Extract information exactly as written. Do not invent products, IDs or quantities.
+"""
@@ -0,0 +1,24 @@
+import base64
+import json
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from cron_job import trigger_history_sync
+import config
+
+router = APIRouter()
+
+
+@router.post("/gmail/push")
+async def gmail_push(request: Request):
+    """Receive a Gmail Pub/Sub push notification and start an incremental sync."""
+    if config.GMAIL_PUSH_TOKEN and request.query_params.get("token") != config.GMAIL_PUSH_TOKEN:
+        return JSONResponse(status_code=403, content={"error": "Invalid push token"})
+
+    try:
+        payload = await request.json()
+        notification = json.loads(base64.b64decode(payload["message"]["data"]))
+    except (KeyError, TypeError, ValueError):
+        return JSONResponse(status_code=400, content={"error": "Malformed push message"})
+
+    trigger_history_sync()
+    return {"received": True, "historyId": notification.get("historyId")}
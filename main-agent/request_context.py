@@ -0,0 +1,28 @@
+"""Per-task state shared by the agent loop and the tools without threading it through every call."""
+import logging
+import uuid
+from contextvars import ContextVar
+
+# Gmail message ID of the email being processed; None for /chat requests
+current_message_id = ContextVar("current_message_id", default=None)
+
+# ID of the chat request or email being handled, added to every log line
+current_trace_id = ContextVar("current_trace_id", default="-")
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s"
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+_default_record_factory = logging.getLogRecordFactory()
+
+
+def _record_factory(*args, **kwargs):
+    record = _default_record_factory(*args, **kwargs)
+    record.trace_id = current_trace_id.get()
+    return record
+
+
+logging.setLogRecordFactory(_record_factory)
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from langchain_core.load import dumpd, load
+from tools import SERIAL_TOOLS
+from tools.base import on_write
+from metrics import inc
+import config
+
+
+def make_key(payload) -> str:
+    """Content hash of any JSON-serializable payload."""
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed key/value cache with per-namespace TTL and a total size cap.
+
+    When the stored values exceed max_bytes, the least recently read entries
+    are evicted first.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+
+    def get(self, namespace: str, key: str, ttl: float):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is None or now - row[1] > ttl:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?", (now, namespace, key)
+            )
+            self.hits += 1
+            return row[0]
+
+    def set(self, namespace: str, key: str, value: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, value, len(value), now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for namespace, key, size in self._conn.execute(
+            "SELECT namespace, key, size FROM entries ORDER BY last_access"
+        ).fetchall():
+            self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self, namespace: str = None):
+        with self._lock, self._conn:
+            if namespace:
+                self._conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            else:
+                self._conn.execute("DELETE FROM entries")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+
+response_cache = ResponseCache(config.RESPONSE_CACHE_PATH, config.RESPONSE_CACHE_MAX_BYTES)
+
+
+def _llm_key(llm, messages: list) -> str:
+    # The bound tool schemas are part of the request, so they are part of the key
+    return make_key({
+        "model": config.OPENAI_MODEL,
+        "tools": getattr(llm, "kwargs", {}).get("tools"),
+        "messages": dumpd(messages),
+    })
+
+
+def _storable(response) -> bool:
+    """Steps that call write tools are only cached when LLM_CACHE_WRITE_STEPS is on."""
+    if config.LLM_CACHE_WRITE_STEPS:
+        return True
+    return not any(call["name"] in SERIAL_TOOLS for call in response.tool_calls)
+
+
+def _from_cache(value: str):
+    inc("agent_llm_cache_hits_total")
+    response = load(json.loads(value))
+    response.response_metadata["cache_hit"] = True
+    return response
+
+
+def cached_llm_invoke(llm, messages: list):
+    """llm.invoke(messages), served from the cache for byte-identical requests."""
+    if not config.LLM_CACHE_ENABLED:
+        return llm.invoke(messages)
+    key = _llm_key(llm, messages)
+    cached = response_cache.get("llm", key, config.LLM_CACHE_TTL)
+    if cached is not None:
+        return _from_cache(cached)
+    response = llm.invoke(messages)
+    if _storable(response):
+        response_cache.set("llm", key, json.dumps(dumpd(response)))
+    return response
+
+
+async def acached_llm_invoke(llm, messages: list):
+    """Async version of cached_llm_invoke."""
+    if not config.LLM_CACHE_ENABLED:
+        return await llm.ainvoke(messages)
+    key = _llm_key(llm, messages)
+    cached = response_cache.get("llm", key, config.LLM_CACHE_TTL)
+    if cached is not None:
+        return _from_cache(cached)
+    response = await llm.ainvoke(messages)
+    if _storable(response):
+        response_cache.set("llm", key, json.dumps(dumpd(response)))
+    return response
+
+
+def cached_tool_result(tool_name: str, tool_args: dict):
+    """Return (key, cached result) for a read-only tool call; key is None when not cacheable."""
+    if not config.TOOL_CACHE_ENABLED or tool_name in SERIAL_TOOLS:
+        return None, None
+    key = make_key({"tool": tool_name, "args": tool_args})
+    cached = response_cache.get("tool", key, config.TOOL_CACHE_TTL)
+    return key, json.loads(cached) if cached is not None else None
+
+
+def _drop_tool_results():
+    if config.TOOL_CACHE_ENABLED:
+        response_cache.clear("tool")
+
+
+# Every successful write tool drops the cached reads it may have changed, whether it ran
+# in the agent loop, the fast path or the extraction engine
+on_write(_drop_tool_results)
+
+
+def store_tool_result(tool_name: str, key: str, result):
+    """Cache a read result; write tools are never cached (they invalidate reads themselves)."""
+    if tool_name in SERIAL_TOOLS:
+        return
+    # Failed lookups (e.g. a customer created moments later) are not cached
+    if key is not None and isinstance(result, dict) and result.get("success", result.get("found", True)):
+        response_cache.set("tool", key, json.dumps(result, default=str))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the agent modules the way main.py does, from main-agent/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,55 @@
+import pytest
+from langchain_core.messages import AIMessage
+import config
+import context_window
+from context_window import fit_history, new_usage
+
+
+class FakeSummarizer:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return AIMessage(content="s" * 200)
+
+
+@pytest.fixture
+def summarizer(monkeypatch):
+    summarizer = FakeSummarizer()
+    monkeypatch.setattr(context_window, "_summarizer", lambda: summarizer)
+    # Four characters per token, whatever tokenizer is installed
+    monkeypatch.setattr(context_window, "count_tokens", lambda text: len(text) // 4)
+    monkeypatch.setattr(config, "HISTORY_TOKEN_BUDGET", 1000)
+    monkeypatch.setattr(config, "HISTORY_KEEP_RATIO", 0.5)
+    return summarizer
+
+
+def _chat(turns: int, summarizer) -> list:
+    """Run turns requests of a 100-token question and a 100-token answer; return the calls before each."""
+    history, calls = [], []
+    for _ in range(turns):
+        history = fit_history(history, new_usage())
+        calls.append(summarizer.calls)
+        history = history + [{"role": "user", "content": "q" * 400}, {"role": "assistant", "content": "a" * 400}]
+    return calls
+
+
+def test_history_within_budget_is_not_summarized(summarizer):
+    _chat(5, summarizer)
+    assert summarizer.calls == 0
+
+
+def test_turns_past_the_budget_share_one_summary(summarizer):
+    calls = _chat(12, summarizer)
+    # The request that first goes over the budget summarizes; the next ones fit again
+    first = calls.index(1)
+    assert calls[first:first + 3] == [1, 1, 1]
+    assert summarizer.calls < 12 - first
+
+
+def test_summary_keeps_recent_turns_within_the_low_water_mark(summarizer):
+    history = [{"role": "user", "content": "q" * 400}] * 12
+    fitted = fit_history(history, new_usage())
+    assert fitted[0]["role"] == "summary"
+    assert sum(len(turn["content"]) // 4 for turn in fitted[1:]) <= 500
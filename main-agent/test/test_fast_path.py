@@ -0,0 +1,27 @@
+import pytest
+from fast_path import parse_order_email
+
+
+def _email(body):
+    return {"from_email": "Sarah Miller <sarah.miller@designagency.com>", "body": body}
+
+
+@pytest.mark.parametrize("body, items", [
+    ("I'm looking to order 2 Laptops ( productId : 1 ) for them.", [(1, 2, "Laptops")]),
+    ("- 3x Wireless Keyboard (product id: 2)\n- 2 Wireless Mouse (productId: 3)",
+     [(2, 3, "Wireless Keyboard"), (3, 2, "Wireless Mouse")]),
+    ("1. 5 Monitors (productId: 4)", [(4, 5, "Monitors")]),
+])
+def test_parses_listed_items(body, items):
+    parsed = parse_order_email(_email(body))
+    assert parsed["from_email"] == "sarah.miller@designagency.com"
+    assert [(i["product_id"], i["quantity"], i["name"]) for i in parsed["items"]] == items
+
+
+@pytest.mark.parametrize("body", [
+    "Order #12 Laptop (productId: 1)",
+    "We hired 2 new developers and 3 Laptops (productId: 1)",
+    "Please send Laptops (productId: 1), 2 of them.",
+])
+def test_leaves_unclear_quantities_to_the_agent(body):
+    assert parse_order_email(_email(body)) is None
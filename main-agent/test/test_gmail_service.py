@@ -0,0 +1,125 @@
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+import config
+import gmail_service
+
+
+class FakeResp:
+    def __init__(self, status):
+        self.status = status
+
+
+class FakeHttpError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.resp = FakeResp(status)
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.batch_sizes.append(len(self.requests))
+        for request_id, request in self.requests:
+            message_id = request["id"]
+            self.service.gets.append(message_id)
+            failures = self.service.failures.get(message_id)
+            if failures:
+                self.callback(request_id, None, FakeHttpError(failures.pop(0)))
+            else:
+                self.callback(request_id, {"id": message_id, "labelIds": ["UNREAD", "INBOX"]}, None)
+
+
+class FakeExecute:
+    def __init__(self, result=None):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class FakeMessages:
+    def __init__(self, service):
+        self.service = service
+
+    def get(self, **kwargs):
+        return kwargs
+
+    def batchModify(self, userId, body):
+        self.service.modified.append(list(body["ids"]))
+        return FakeExecute()
+
+
+class FakeService:
+    """Just enough of the Gmail API client for get_messages and mark_many_as_read."""
+
+    def __init__(self, failures=None):
+        # message_id -> HTTP statuses its next fetches fail with
+        self.failures = {key: list(value) for key, value in (failures or {}).items()}
+        self.batch_sizes = []
+        self.gets = []
+        self.modified = []
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return FakeMessages(self)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(config, "GMAIL_BATCH_RETRIES", 2)
+    monkeypatch.setattr(config, "GMAIL_BATCH_RETRY_BACKOFF", 0)
+
+
+def test_get_messages_batches_requests():
+    service = FakeService()
+    ids = [f"m{i}" for i in range(gmail_service.BATCH_SIZE * 2 + 5)]
+
+    messages = gmail_service.get_messages(ids, service=service)
+
+    assert list(messages) == ids
+    assert service.batch_sizes == [gmail_service.BATCH_SIZE, gmail_service.BATCH_SIZE, 5]
+
+
+def test_get_messages_retries_throttled_and_server_errors():
+    service = FakeService(failures={"m1": [429], "m2": [503, 500]})
+
+    messages = gmail_service.get_messages(["m0", "m1", "m2"], service=service)
+
+    assert set(messages) == {"m0", "m1", "m2"}
+    assert service.gets.count("m0") == 1
+    assert service.gets.count("m1") == 2
+    assert service.gets.count("m2") == 3
+
+
+def test_get_messages_drops_permanent_and_exhausted_failures():
+    service = FakeService(failures={"gone": [404], "busy": [503, 503, 503]})
+
+    messages = gmail_service.get_messages(["ok", "gone", "busy"], service=service)
+
+    assert set(messages) == {"ok"}
+    assert service.gets.count("gone") == 1
+    assert service.gets.count("busy") == config.GMAIL_BATCH_RETRIES + 1
+
+
+def test_mark_many_as_read_chunks_batch_modify(monkeypatch):
+    service = FakeService()
+    monkeypatch.setattr(gmail_service, "get_gmail_service", lambda: service)
+    ids = [f"m{i}" for i in range(gmail_service.BATCH_MODIFY_LIMIT + 1)]
+
+    assert gmail_service.mark_many_as_read(ids)
+    assert [len(chunk) for chunk in service.modified] == [gmail_service.BATCH_MODIFY_LIMIT, 1]
+    assert sum(service.modified, []) == ids
@@ -0,0 +1,69 @@
+import pytest
+from tools.product_search import ProductSearchIndex, confident_match, same_name
+from tools.product_tools import _find_product_result
+
+CATALOG = [
+    {"id": 1, "name": "Laptop", "price": "999.99", "stock": 10},
+    {"id": 2, "name": "Wireless Keyboard", "price": "49.99", "stock": 10},
+    {"id": 3, "name": "Wireless Mouse", "price": "29.99", "stock": 10},
+    {"id": 4, "name": "Monitor", "price": "249.99", "stock": 10},
+    {"id": 5, "name": "Keyboard", "price": "79.99", "stock": 10},
+]
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return {"success": True, "data": self._data}
+
+
+@pytest.fixture
+def index():
+    index = ProductSearchIndex()
+    index.sync(CATALOG)
+    return index
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Laptop", 1),
+    ("laptops", 1),
+    ("Wireless Keyboards", 2),
+    ("keyboard wireless", 2),
+    ("Wirless Mouse", 3),
+    ("Monitors", 4),
+])
+def test_confident_match_accepts_the_named_product(index, query, expected):
+    assert confident_match(query, index.search(query))["id"] == expected
+
+
+@pytest.mark.parametrize("query", [
+    "Laptop Bag",
+    "Wireless Headphones",
+    "Keyboard (Mechanical, Wired)",
+    "Mechanical Keyboard",
+])
+def test_confident_match_rejects_near_misses(index, query):
+    assert index.search(query)
+    assert confident_match(query, index.search(query)) is None
+
+
+def test_same_name_ignores_case_punctuation_and_plurals():
+    assert same_name("Wireless-Keyboards", "wireless keyboard")
+    assert not same_name("Laptop", "Laptop Stand")
+
+
+@pytest.mark.parametrize("query", ["Laptop Bag", "Wireless Headphones", "Keyboard (Mechanical, Wired)"])
+def test_find_product_returns_candidates_not_a_guess(query):
+    result = _find_product_result(FakeResponse(CATALOG), query)
+    assert result["found"] is False
+    assert "product" not in result
+    assert result["candidates"]
+
+
+def test_find_product_returns_exact_match_with_candidates():
+    result = _find_product_result(FakeResponse(CATALOG), "Keyboard")
+    assert result["found"] is True
+    assert result["product"]["id"] == 5
+    assert result["candidates"][0]["id"] == 5
@@ -0,0 +1,107 @@
+"""How tool results are written into the ToolMessages the model reads.
+
+Encodings (TOOL_RESULT_ENCODING):
+    "repr"     str(result), the original Python-dict format
+    "json"     compact JSON of the whole result
+    "compact"  per-tool field whitelists, lists of records as tables, JSON for the rest
+
+Every encoding is cut to MAX_TOOL_RESULT_TOKENS with a truncation marker.
+"""
+import json
+from context_window import truncate_tool_result
+import config
+
+_CUSTOMER = {"id": None, "name": None, "email": None}
+_PRODUCT = {"id": None, "name": None, "price": None, "stock": None}
+_ORDER = {
+    "id": None,
+    "customerId": None,
+    "totalAmount": None,
+    "status": None,
+    "items": {"productId": None, "quantity": None, "price": None},
+}
+
+# Per tool: result key -> fields kept (None keeps a value whole, a dict recurses).
+# Keys not listed here are passed through unchanged.
+TOOL_RESULT_FIELDS = {
+    "find_customer": {"customer": _CUSTOMER},
+    "find_customer_by_email": {"customer": _CUSTOMER},
+    "get_customer_by_id": {"customer": {**_CUSTOMER, "phone": None, "address": None}},
+    "find_product": {"product": _PRODUCT},
+    "get_product_by_id": {"product": {**_PRODUCT, "description": None}},
+    "create_product": {"product": _PRODUCT},
+    "update_product": {"product": _PRODUCT},
+    "create_order": {"order": _ORDER},
+    "create_bulk_order": {"order": _ORDER},
+}
+
+
+def _project(value, spec):
+    if spec is None:
+        return value
+    if isinstance(value, list):
+        return [_project(item, spec) for item in value]
+    if isinstance(value, dict):
+        return {key: _project(value[key], sub) for key, sub in spec.items() if key in value}
+    return value
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _is_table(value) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)) or (isinstance(value, str) and any(c in value for c in ',"\n')):
+        return _dumps(value)
+    return str(value)
+
+
+def _table(name: str, rows: list) -> str:
+    """name[count]{col,...}: then one comma-separated line per row, capped at TOOL_RESULT_MAX_ROWS."""
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    shown = rows[:config.TOOL_RESULT_MAX_ROWS]
+    lines = [f"{name}[{len(rows)}]{{{','.join(columns)}}}:"]
+    lines += [",".join(_cell(row.get(column)) for column in columns) for row in shown]
+    if len(rows) > len(shown):
+        lines.append(f"...[{len(rows) - len(shown)} more rows]")
+    return "\n".join(lines)
+
+
+def encode_repr(tool_name: str, result) -> str:
+    return str(result)
+
+
+def encode_json(tool_name: str, result) -> str:
+    return _dumps(result) if isinstance(result, (dict, list)) else str(result)
+
+
+def encode_compact(tool_name: str, result) -> str:
+    """Whitelisted fields; the scalar part as one JSON line, each list of records as a table after it."""
+    if _is_table(result):
+        return _table("rows", result)
+    if not isinstance(result, dict):
+        return str(result)
+    fields = TOOL_RESULT_FIELDS.get(tool_name, {})
+    result = {key: _project(value, fields.get(key)) for key, value in result.items()}
+    tables = {key: value for key, value in result.items() if _is_table(value)}
+    head = {key: value for key, value in result.items() if key not in tables}
+    return "\n".join([_dumps(head)] + [_table(key, rows) for key, rows in tables.items()])
+
+
+ENCODERS = {
+    "repr": encode_repr,
+    "json": encode_json,
+    "compact": encode_compact,
+}
+
+
+def encode_tool_result(tool_name: str, result, encoding: str = None) -> str:
+    """Render a tool result for a ToolMessage with the configured (or given) encoding."""
+    encoder = ENCODERS[encoding or config.TOOL_RESULT_ENCODING]
+    return truncate_tool_result(encoder(tool_name, result))
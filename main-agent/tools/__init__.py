@@ -15,6 +15,7 @@ from tools.customer_tools import (
 from tools.order_tools import (
     get_all_orders,
     create_order,
+    create_bulk_order,
 )
 from tools.gmail_tools import send_gmail
 
@@ -31,5 +32,77 @@ ALL_TOOLS = [
     get_customer_by_id,
     get_all_orders,
     create_order,
+    create_bulk_order,
     send_gmail,
 ]
+
+# Named subsets of ALL_TOOLS; a request binds only its profile's schemas.
+# None means every tool.
+TOOL_PROFILES = {
+    # What the cron job needs to turn an order email into orders and a reply
+    "order-email": [
+        "find_customer_by_email",
+        "find_customer",
+        "get_product_by_id",
+        "find_product",
+        "create_order",
+        "create_bulk_order",
+        "send_gmail",
+    ],
+    "catalog": [
+        "find_product",
+        "get_all_products",
+        "get_product_by_id",
+        "create_product",
+        "update_product",
+        "delete_product",
+    ],
+    "customers": [
+        "find_customer",
+        "find_customer_by_email",
+        "get_all_customers",
+        "get_customer_by_id",
+    ],
+    "orders": [
+        "get_all_orders",
+        "find_customer",
+        "find_customer_by_email",
+        "get_customer_by_id",
+        "get_product_by_id",
+        "find_product",
+        "create_order",
+        "create_bulk_order",
+    ],
+    "admin": None,
+}
+
+# Keywords that pick a narrower profile for a /chat message (see select_profile)
+_PROFILE_KEYWORDS = {
+    "catalog": ("product", "catalog", "price", "stock", "inventory"),
+    "customers": ("customer", "client"),
+    "orders": ("order",),
+}
+
+
+def select_profile(query: str) -> str:
+    """Guess the tool profile a message needs from cheap keyword checks.
+
+    Emails go to "order-email"; a message that mentions exactly one area gets
+    that area's profile; anything else gets "admin" (every tool).
+    """
+    if query.lstrip().lower().startswith("from:"):
+        return "order-email"
+    text = query.lower()
+    matches = [name for name, words in _PROFILE_KEYWORDS.items() if any(word in text for word in words)]
+    return matches[0] if len(matches) == 1 else "admin"
+
+
+# Tools with side effects; these never run concurrently with other calls of the same turn
+SERIAL_TOOLS = {
+    "create_product",
+    "update_product",
+    "delete_product",
+    "create_order",
+    "create_bulk_order",
+    "send_gmail",
+}
@@ -0,0 +1,61 @@
+from langchain_core.tools import StructuredTool
+import config
+
+_write_hooks = []
+
+
+def on_write(hook):
+    """Register hook() to run after any write tool changes store data, e.g. to drop cached reads."""
+    _write_hooks.append(hook)
+
+
+def notify_write():
+    """Called by the write tools' result helpers, so it runs whichever code path invoked the tool."""
+    for hook in _write_hooks:
+        hook()
+
+
+def async_tool(coroutine):
+    """Turn a sync function into a tool that also exposes an async implementation.
+
+    Works like ``@tool`` (name, description and args come from the sync function),
+    but ``ainvoke`` awaits ``coroutine`` instead of running the sync body in a thread.
+    """
+    def decorator(func):
+        return StructuredTool.from_function(func=func, coroutine=coroutine)
+    return decorator
+
+
+def page_bounds(limit: int, offset: int) -> tuple:
+    """Clamp a list tool's paging arguments; limit never exceeds LIST_TOOL_MAX_LIMIT."""
+    limit = max(1, min(limit or config.LIST_TOOL_DEFAULT_LIMIT, config.LIST_TOOL_MAX_LIMIT))
+    return limit, max(0, offset or 0)
+
+
+def select_fields(fields: list, allowed: tuple, default: tuple) -> list:
+    """The requested fields that exist, or the tool's default fields when none do."""
+    chosen = [field for field in fields or [] if field in allowed]
+    return chosen or list(default)
+
+
+def list_result(data: dict, key: str, limit: int, offset: int, fields: list) -> dict:
+    """Build a list tool's result from an API list response.
+
+    Works whether the server already applied the page (and reports "pagination")
+    or returned the whole list; only the selected fields are kept.
+    """
+    records = data["data"]
+    pagination = data.get("pagination")
+    if pagination is None:
+        total = len(records)
+        records = records[offset:offset + limit]
+    else:
+        total = pagination["total"]
+    next_offset = offset + len(records)
+    return {
+        "success": True,
+        key: [{field: record[field] for field in fields if field in record} for record in records],
+        "total": total,
+        "offset": offset,
+        "next_offset": next_offset if next_offset < total else None,
+    }
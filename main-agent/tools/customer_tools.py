@@ -1,74 +1,197 @@
-from langchain_core.tools import tool
-import httpx
+import threading
+import time
+from tools.base import async_tool, list_result, page_bounds, select_fields
+import express_client
 import config
 
+CUSTOMER_FIELDS = ("id", "name", "email", "phone", "address")
+DEFAULT_CUSTOMER_FIELDS = ("id", "name", "email")
 
-@tool
-def get_all_customers() -> dict:
-    """Get all customers from the store database.
 
-    Returns a list of all customers with their details including
-    id, name, email, phone, and address.
-    """
-    with httpx.Client() as client:
-        response = client.get(f"{config.EXPRESS_API_URL}/customers")
-        data = response.json()
+class _EmailIndex:
+    """In-process email -> customer map, used when /customers/search is unavailable."""
 
-        if data.get("success"):
-            return {"success": True, "customers": data["data"]}
-        return {"success": False, "error": "Failed to fetch customers"}
+    def __init__(self):
+        self._by_email = {}
+        self._built_at = 0.0
+        self._lock = threading.Lock()
 
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._built_at > config.CUSTOMER_INDEX_TTL
+
+    def rebuild(self, customers: list):
+        by_email = {customer["email"].lower(): customer for customer in customers}
+        with self._lock:
+            self._by_email = by_email
+            self._built_at = time.monotonic()
+
+    def get(self, customer_email: str):
+        return self._by_email.get(customer_email.lower())
+
+
+_email_index = _EmailIndex()
+
+
+def _search_matches(response):
+    """Matches from /customers/search, or None if the backend doesn't support it."""
+    if response.status_code == 404 or response.status_code >= 500:
+        return None
+    data = response.json()
+    return data["data"] if data.get("success") else None
+
+
+def _index_lookup(customer_email: str):
+    """Look up an email in the fallback index, rebuilding it once if stale or missing."""
+    if not _email_index.is_stale():
+        customer = _email_index.get(customer_email)
+        if customer:
+            return customer
+    response = express_client.request("GET", "/customers")
+    _email_index.rebuild(response.json()["data"])
+    return _email_index.get(customer_email)
+
+
+async def _aindex_lookup(customer_email: str):
+    if not _email_index.is_stale():
+        customer = _email_index.get(customer_email)
+        if customer:
+            return customer
+    response = await express_client.arequest("GET", "/customers")
+    _email_index.rebuild(response.json()["data"])
+    return _email_index.get(customer_email)
+
+
+def _list_params(limit: int, offset: int, fields: list) -> dict:
+    """Page and project on the server; orders are left out of the list."""
+    limit, offset = page_bounds(limit, offset)
+    fields = select_fields(fields, CUSTOMER_FIELDS, DEFAULT_CUSTOMER_FIELDS)
+    return {"limit": limit, "offset": offset, "fields": ",".join(fields), "include": ""}
+
+
+def _all_customers_result(response, params: dict) -> dict:
+    data = response.json()
+
+    if data.get("success"):
+        return list_result(data, "customers", params["limit"], params["offset"], params["fields"].split(","))
+    return {"success": False, "error": "Failed to fetch customers"}
+
+
+def _scan_by_name(response, customer_name: str):
+    for customer in response.json()["data"]:
+        if customer_name.lower() in customer["name"].lower():
+            return customer
+    return None
 
-@tool
-def find_customer(customer_name: str) -> dict:
-    """Find a customer by name from the store database.
+
+def _find_customer_result(customer, customer_name: str) -> dict:
+    if customer:
+        return {"found": True, "customer": customer}
+    return {"found": False, "error": f"Customer '{customer_name}' not found"}
+
+
+def _find_customer_by_email_result(customer, customer_email: str) -> dict:
+    if customer:
+        return {"found": True, "customer": customer}
+    return {"found": False, "error": f"Customer with email '{customer_email}' not found"}
+
+
+def _customer_result(response, customer_id: int) -> dict:
+    if response.status_code == 404:
+        return {"success": False, "error": f"Customer with ID {customer_id} not found"}
+
+    data = response.json()
+    if data.get("success"):
+        return {"success": True, "customer": data["data"]}
+    return {"success": False, "error": data.get("error", "Failed to fetch customer")}
+
+
+async def _aget_all_customers(limit: int = None, offset: int = 0, fields: list[str] = None) -> dict:
+    params = _list_params(limit, offset, fields)
+    response = await express_client.arequest("GET", "/customers", params=params)
+    return _all_customers_result(response, params)
+
+
+@async_tool(_aget_all_customers)
+def get_all_customers(limit: int = None, offset: int = 0, fields: list[str] = None) -> dict:
+    """List customers from the store database, one page at a time.
+
+    Returns the page of customers plus "total" and "next_offset" (null on the
+    last page). Pass next_offset as offset to get the following page.
 
     Args:
-        customer_name: Name of the customer to search for (e.g. 'John Doe')
+        limit: Customers per page (default 20, at most 50)
+        offset: Number of customers to skip
+        fields: Customer fields to return, from id, name, email, phone, address
+            (default id, name, email)
     """
-    with httpx.Client() as client:
-        response = client.get(f"{config.EXPRESS_API_URL}/customers")
-        customers = response.json()["data"]
+    params = _list_params(limit, offset, fields)
+    response = express_client.request("GET", "/customers", params=params)
+    return _all_customers_result(response, params)
+
 
-        for customer in customers:
-            if customer_name.lower() in customer["name"].lower():
-                return {"found": True, "customer": customer}
+async def _afind_customer(customer_name: str) -> dict:
+    response = await express_client.arequest("GET", "/customers/search", params={"name": customer_name})
+    matches = _search_matches(response)
+    if matches is None:
+        customer = _scan_by_name(await express_client.arequest("GET", "/customers"), customer_name)
+    else:
+        customer = matches[0] if matches else None
+    return _find_customer_result(customer, customer_name)
 
-        return {"found": False, "error": f"Customer '{customer_name}' not found"}
 
+@async_tool(_afind_customer)
+def find_customer(customer_name: str) -> dict:
+    """Find a customer by name from the store database.
 
-@tool
+    Args:
+        customer_name: Name of the customer to search for (e.g. 'John Doe')
+    """
+    response = express_client.request("GET", "/customers/search", params={"name": customer_name})
+    matches = _search_matches(response)
+    if matches is None:
+        customer = _scan_by_name(express_client.request("GET", "/customers"), customer_name)
+    else:
+        customer = matches[0] if matches else None
+    return _find_customer_result(customer, customer_name)
+
+
+async def _afind_customer_by_email(customer_email: str) -> dict:
+    response = await express_client.arequest("GET", "/customers/search", params={"email": customer_email})
+    matches = _search_matches(response)
+    if matches is None:
+        customer = await _aindex_lookup(customer_email)
+    else:
+        customer = matches[0] if matches else None
+    return _find_customer_by_email_result(customer, customer_email)
+
+
+@async_tool(_afind_customer_by_email)
 def find_customer_by_email(customer_email: str) -> dict:
     """Find a customer by email from the store database.
 
     Args:
         customer_email: Email of the customer to search for (e.g. 'john@example.com')
     """
-    with httpx.Client() as client:
-        response = client.get(f"{config.EXPRESS_API_URL}/customers")
-        customers = response.json()["data"]
+    response = express_client.request("GET", "/customers/search", params={"email": customer_email})
+    matches = _search_matches(response)
+    if matches is None:
+        customer = _index_lookup(customer_email)
+    else:
+        customer = matches[0] if matches else None
+    return _find_customer_by_email_result(customer, customer_email)
 
-        for customer in customers:
-            if customer_email.lower() == customer["email"].lower():
-                return {"found": True, "customer": customer}
 
-        return {"found": False, "error": f"Customer with email '{customer_email}' not found"}
+async def _aget_customer_by_id(customer_id: int) -> dict:
+    response = await express_client.arequest("GET", f"/customers/{customer_id}")
+    return _customer_result(response, customer_id)
 
 
-@tool
+@async_tool(_aget_customer_by_id)
 def get_customer_by_id(customer_id: int) -> dict:
     """Get a single customer by their ID.
 
     Args:
         customer_id: The unique ID of the customer to retrieve
     """
-    with httpx.Client() as client:
-        response = client.get(f"{config.EXPRESS_API_URL}/customers/{customer_id}")
-
-        if response.status_code == 404:
-            return {"success": False, "error": f"Customer with ID {customer_id} not found"}
-
-        data = response.json()
-        if data.get("success"):
-            return {"success": True, "customer": data["data"]}
-        return {"success": False, "error": data.get("error", "Failed to fetch customer")}
+    response = express_client.request("GET", f"/customers/{customer_id}")
+    return _customer_result(response, customer_id)
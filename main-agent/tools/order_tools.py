@@ -1,25 +1,93 @@
-from langchain_core.tools import tool
-import httpx
-import config
+import hashlib
+from tools.base import async_tool, list_result, notify_write, page_bounds, select_fields
+from tools.product_cache import catalog_cache
+from request_context import current_message_id
+import express_client
 
+ORDER_FIELDS = ("id", "customerId", "totalAmount", "status", "createdAt", "customer", "items")
+DEFAULT_ORDER_FIELDS = ("id", "customerId", "totalAmount", "status", "items")
 
-@tool
-def get_all_orders() -> dict:
-    """Get all orders from the store database.
 
-    Returns a list of all orders with their details including
-    order id, customer, product, and status.
+def _idempotency_headers(product_ids: list) -> dict:
+    """Key an order to the Gmail message being processed, so a retried email or a
+    repeated tool call returns the existing order instead of creating another."""
+    message_id = current_message_id.get()
+    if message_id is None:
+        return {}
+    if len(product_ids) == 1:
+        return {"Idempotency-Key": f"gmail:{message_id}:product:{product_ids[0]}"}
+    # Hashed so the key stays within the backend's 128-character column however many products there are
+    products = "-".join(str(product_id) for product_id in sorted(set(product_ids)))
+    digest = hashlib.sha256(products.encode()).hexdigest()[:16]
+    return {"Idempotency-Key": f"gmail:{message_id}:products:{digest}"}
+
+
+def _list_params(limit: int, offset: int, fields: list) -> dict:
+    """Page and project on the server; "customer" and "items" become compact includes."""
+    limit, offset = page_bounds(limit, offset)
+    fields = select_fields(fields, ORDER_FIELDS, DEFAULT_ORDER_FIELDS)
+    return {
+        "limit": limit,
+        "offset": offset,
+        "fields": ",".join(fields),
+        "include": ",".join(name for name in ("customer", "items") if name in fields),
+    }
+
+
+def _all_orders_result(response, params: dict) -> dict:
+    data = response.json()
+
+    if data.get("success"):
+        return list_result(data, "orders", params["limit"], params["offset"], params["fields"].split(","))
+    return {"success": False, "error": "Failed to fetch orders"}
+
+
+def _create_order_result(response, product_id: int) -> dict:
+    if response.status_code == 404:
+        return {"success": False, "error": "Customer or product not found"}
+
+    data = response.json()
+    if data.get("success"):
+        # The order reduced the product's stock, so the cached copy is out of date
+        catalog_cache.invalidate_product(product_id)
+        notify_write()
+        return {"success": True, "order": data["data"]}
+    return {"success": False, "error": data.get("error", "Failed to create order")}
+
+
+async def _aget_all_orders(limit: int = None, offset: int = 0, fields: list[str] = None) -> dict:
+    params = _list_params(limit, offset, fields)
+    response = await express_client.arequest("GET", "/orders", params=params)
+    return _all_orders_result(response, params)
+
+
+@async_tool(_aget_all_orders)
+def get_all_orders(limit: int = None, offset: int = 0, fields: list[str] = None) -> dict:
+    """List orders from the store database, one page at a time.
+
+    Returns the page of orders plus "total" and "next_offset" (null on the
+    last page). Pass next_offset as offset to get the following page.
+
+    Args:
+        limit: Orders per page (default 20, at most 50)
+        offset: Number of orders to skip
+        fields: Order fields to return, from id, customerId, totalAmount, status,
+            createdAt, customer, items (default id, customerId, totalAmount, status, items)
     """
-    with httpx.Client() as client:
-        response = client.get(f"{config.EXPRESS_API_URL}/orders")
-        data = response.json()
+    params = _list_params(limit, offset, fields)
+    response = express_client.request("GET", "/orders", params=params)
+    return _all_orders_result(response, params)
 
-        if data.get("success"):
-            return {"success": True, "orders": data["data"]}
-        return {"success": False, "error": "Failed to fetch orders"}
 
+async def _acreate_order(customer_id: int, product_id: int) -> dict:
+    payload = {"product_id": product_id}
+    response = await express_client.arequest(
+        "POST", f"/customers/{customer_id}/orders", json=payload, headers=_idempotency_headers([product_id])
+    )
+    return _create_order_result(response, product_id)
 
-@tool
+
+@async_tool(_acreate_order)
 def create_order(customer_id: int, product_id: int) -> dict:
     """Create a new order for a customer.
 
@@ -27,16 +95,54 @@ def create_order(customer_id: int, product_id: int) -> dict:
         customer_id: The unique ID of the customer placing the order
         product_id: The unique ID of the product to order
     """
-    with httpx.Client() as client:
-        payload = {"product_id": product_id}
-        response = client.post(
-            f"{config.EXPRESS_API_URL}/customers/{customer_id}/orders", json=payload
-        )
-
-        if response.status_code == 404:
-            return {"success": False, "error": "Customer or product not found"}
-
-        data = response.json()
-        if data.get("success"):
-            return {"success": True, "order": data["data"]}
-        return {"success": False, "error": data.get("error", "Failed to create order")}
+    payload = {"product_id": product_id}
+    response = express_client.request(
+        "POST", f"/customers/{customer_id}/orders", json=payload, headers=_idempotency_headers([product_id])
+    )
+    return _create_order_result(response, product_id)
+
+
+def _bulk_order_payload(customer_id: int, items: list) -> dict:
+    return {
+        "customerId": customer_id,
+        "items": [
+            {"productId": item["product_id"], "quantity": item.get("quantity") or 1}
+            for item in items
+        ],
+    }
+
+
+def _create_bulk_order_result(response, product_ids: list) -> dict:
+    data = response.json()
+    if data.get("success"):
+        for product_id in product_ids:
+            catalog_cache.invalidate_product(product_id)
+        notify_write()
+        return {"success": True, "order": data["data"]}
+    return {"success": False, "error": data.get("error", "Failed to create order")}
+
+
+async def _acreate_bulk_order(customer_id: int, items: list) -> dict:
+    product_ids = [item["product_id"] for item in items]
+    response = await express_client.arequest(
+        "POST", "/orders", json=_bulk_order_payload(customer_id, items), headers=_idempotency_headers(product_ids)
+    )
+    return _create_bulk_order_result(response, product_ids)
+
+
+@async_tool(_acreate_bulk_order)
+def create_bulk_order(customer_id: int, items: list[dict]) -> dict:
+    """Create one order containing several products (and quantities) for a customer.
+
+    The whole order is created in a single transaction: if any product is
+    missing or out of stock, nothing is ordered.
+
+    Args:
+        customer_id: The unique ID of the customer placing the order
+        items: List of {"product_id": int, "quantity": int} entries, one per product
+    """
+    product_ids = [item["product_id"] for item in items]
+    response = express_client.request(
+        "POST", "/orders", json=_bulk_order_payload(customer_id, items), headers=_idempotency_headers(product_ids)
+    )
+    return _create_bulk_order_result(response, product_ids)
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+import express_client
+import config
+
+
+class CachedResponse:
+    """Minimal stand-in for httpx.Response served from the cache."""
+
+    def __init__(self, status_code: int, data, etag: str = None):
+        self.status_code = status_code
+        self._data = data
+        self.etag = etag
+
+    def json(self):
+        return self._data
+
+
+class CatalogCache:
+    """LRU cache of product GET responses with TTL and ETag revalidation.
+
+    Fresh entries are served without touching the network. Expired entries are
+    revalidated with If-None-Match, so an unchanged catalog costs a 304 instead
+    of the full body. Only successful responses are stored.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+    def _lookup(self, path: str):
+        """Return (fresh entry, stale entry); at most one is set."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(path)
+            if entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0], None
+            self.misses += 1
+            return None, entry[0]
+
+    def _store(self, path: str, cached: CachedResponse):
+        with self._lock:
+            self._entries[path] = (cached, time.monotonic() + self.ttl)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _handle(self, path: str, stale, response):
+        if response.status_code == 304 and stale is not None:
+            with self._lock:
+                self.revalidated += 1
+            self._store(path, stale)
+            return stale
+        if response.status_code != 200:
+            return response
+        cached = CachedResponse(200, response.json(), response.headers.get("etag"))
+        self._store(path, cached)
+        return cached
+
+    @staticmethod
+    def _headers(stale):
+        return {"If-None-Match": stale.etag} if stale is not None and stale.etag else {}
+
+    def get(self, path: str):
+        fresh, stale = self._lookup(path)
+        if fresh is not None:
+            return fresh
+        response = express_client.request("GET", path, headers=self._headers(stale))
+        return self._handle(path, stale, response)
+
+    async def aget(self, path: str):
+        fresh, stale = self._lookup(path)
+        if fresh is not None:
+            return fresh
+        response = await express_client.arequest("GET", path, headers=self._headers(stale))
+        return self._handle(path, stale, response)
+
+    def put_product(self, product: dict):
+        """Write-through after a successful create/update: refresh the item, drop the list."""
+        self._store(f"/products/{product['id']}", CachedResponse(200, {"success": True, "data": product}))
+        self.invalidate("/products")
+
+    def invalidate(self, *paths: str):
+        with self._lock:
+            for path in paths:
+                self._entries.pop(path, None)
+
+    def invalidate_product(self, product_id: int):
+        self.invalidate("/products", f"/products/{product_id}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "evictions": self.evictions,
+            }
+
+
+catalog_cache = CatalogCache(ttl=config.PRODUCT_CACHE_TTL, max_entries=config.PRODUCT_CACHE_MAX_ENTRIES)
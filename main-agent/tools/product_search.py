@@ -0,0 +1,148 @@
+import heapq
+import re
+import threading
+from collections import defaultdict
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> list:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _trigrams(text: str) -> set:
+    """Trigrams of each token, padded like pg_trgm so short words still match."""
+    grams = set()
+    for token in _tokens(text):
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: str, b: str) -> float:
+    """Trigram Dice similarity of two names, 0.0 to 1.0."""
+    grams_a, grams_b = _trigrams(a), _trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase tokens without punctuation or a plural "s", so "Laptops" and "laptop" compare equal."""
+    return " ".join(
+        token[:-1] if token.endswith("s") and len(token) > 3 else token
+        for token in _tokens(text)
+    )
+
+
+def same_name(a: str, b: str) -> bool:
+    return normalize_name(a) == normalize_name(b)
+
+
+def confident_match(query: str, matches: list, min_score: float = 0.8, min_margin: float = 0.15):
+    """Pick the product that search() results clearly name, or None.
+
+    An exact name (after normalize_name) always counts. Otherwise the best hit
+    must be nearly identical to the query (a typo, not a different product) and
+    beat the runner-up by min_margin: "Laptop Bag" is not "Laptop", and
+    "Wireless Headphones" is not "Wireless Mouse".
+    """
+    for _, product in matches:
+        if same_name(query, product["name"]):
+            return product
+
+    scored = sorted(
+        ((similarity(query, product["name"]), product) for _, product in matches),
+        key=lambda pair: pair[0],
+        reverse=True,
+    )
+    if not scored or scored[0][0] < min_score:
+        return None
+    if len(scored) > 1 and scored[0][0] - scored[1][0] < min_margin:
+        return None
+    return scored[0][1]
+
+
+class ProductSearchIndex:
+    """Trigram inverted index over product names.
+
+    Handles typos and reordered words from customer emails, and ranks every
+    candidate so the agent gets the best matches from a single lookup.
+    """
+
+    def __init__(self):
+        self._products = {}
+        self._grams = {}
+        self._names = {}
+        self._postings = defaultdict(set)
+        self._source = None
+        self._lock = threading.Lock()
+
+    def _add(self, product: dict):
+        self._remove(product["id"])
+        grams = _trigrams(product["name"])
+        self._products[product["id"]] = product
+        self._grams[product["id"]] = grams
+        self._names[product["id"]] = " ".join(_tokens(product["name"]))
+        for gram in grams:
+            self._postings[gram].add(product["id"])
+
+    def _remove(self, product_id):
+        self._products.pop(product_id, None)
+        self._names.pop(product_id, None)
+        for gram in self._grams.pop(product_id, ()):
+            ids = self._postings[gram]
+            ids.discard(product_id)
+            if not ids:
+                del self._postings[gram]
+
+    def add(self, product: dict):
+        with self._lock:
+            self._add(product)
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove(product_id)
+
+    def sync(self, products: list):
+        """Bring the index in line with a catalog listing, re-indexing only renamed, new or removed products."""
+        with self._lock:
+            if products is self._source:
+                return
+            seen = set()
+            for product in products:
+                seen.add(product["id"])
+                indexed = self._products.get(product["id"])
+                if indexed is None or indexed["name"] != product["name"]:
+                    self._add(product)
+                else:
+                    self._products[product["id"]] = product
+            for product_id in set(self._products) - seen:
+                self._remove(product_id)
+            self._source = products
+
+    def search(self, query: str, top_k: int = 5, min_score: float = 0.3) -> list:
+        """Return up to top_k (score, product) pairs, best first."""
+        query_grams = _trigrams(query)
+        if not query_grams:
+            return []
+        normalized = " ".join(_tokens(query))
+
+        with self._lock:
+            overlap = defaultdict(int)
+            for gram in query_grams:
+                for product_id in self._postings.get(gram, ()):
+                    overlap[product_id] += 1
+
+            ranked = []
+            for product_id, shared in overlap.items():
+                score = 2 * shared / (len(query_grams) + len(self._grams[product_id]))
+                if normalized in self._names[product_id]:
+                    score = 0.5 + score / 2
+                if score >= min_score:
+                    ranked.append((round(score, 3), self._products[product_id]))
+
+        return heapq.nlargest(top_k, ranked, key=lambda pair: pair[0])
+
+
+product_index = ProductSearchIndex()
@@ -1,62 +1,177 @@
-from langchain_core.tools import tool
-import httpx
+from tools.base import async_tool, list_result, notify_write, page_bounds, select_fields
+from tools.product_cache import catalog_cache
+from tools.product_search import confident_match, product_index
+import express_client
 import config
 
+PRODUCT_FIELDS = ("id", "name", "description", "price", "stock")
+DEFAULT_PRODUCT_FIELDS = ("id", "name", "price", "stock")
+
+
+def _find_product_result(response, product_name: str) -> dict:
+    product_index.sync(response.json()["data"])
+    matches = product_index.search(
+        product_name,
+        top_k=config.PRODUCT_SEARCH_TOP_K,
+        min_score=config.PRODUCT_SEARCH_MIN_SCORE,
+    )
+
+    candidates = [
+        {"id": product["id"], "name": product["name"], "score": score}
+        for score, product in matches
+    ]
+    product = confident_match(
+        product_name,
+        matches,
+        min_score=config.PRODUCT_MATCH_MIN_SCORE,
+        min_margin=config.PRODUCT_MATCH_MIN_MARGIN,
+    )
+
+    if product:
+        return {"found": True, "product": product, "candidates": candidates}
+    if candidates:
+        # Similar names are not the product asked for; let the caller decide (or ask the sender)
+        return {
+            "found": False,
+            "error": f"No product clearly matches '{product_name}'",
+            "candidates": candidates,
+        }
+    return {"found": False, "error": f"Product '{product_name}' not found"}
+
+
+def _all_products_result(response, limit: int, offset: int, fields: list) -> dict:
+    data = response.json()
+
+    if data.get("success"):
+        # The whole catalog is cached for find_product, so pages are cut locally
+        limit, offset = page_bounds(limit, offset)
+        fields = select_fields(fields, PRODUCT_FIELDS, DEFAULT_PRODUCT_FIELDS)
+        return list_result(data, "products", limit, offset, fields)
+    return {"success": False, "error": "Failed to fetch products"}
+
+
+def _product_result(response, product_id: int, error: str) -> dict:
+    if response.status_code == 404:
+        return {"success": False, "error": f"Product with ID {product_id} not found"}
+
+    data = response.json()
+    if data.get("success"):
+        return {"success": True, "product": data["data"]}
+    return {"success": False, "error": data.get("error", error)}
+
+
+def _create_product_result(response) -> dict:
+    data = response.json()
+
+    if data.get("success"):
+        catalog_cache.put_product(data["data"])
+        product_index.add(data["data"])
+        notify_write()
+        return {"success": True, "product": data["data"]}
+    return {"success": False, "error": data.get("error", "Failed to create product")}
+
+
+def _update_product_result(response, product_id: int) -> dict:
+    result = _product_result(response, product_id, "Failed to update product")
+    if result["success"]:
+        catalog_cache.put_product(result["product"])
+        product_index.add(result["product"])
+        notify_write()
+    return result
+
+
+def _update_payload(name, price, stock, description) -> dict:
+    payload = {}
+    if name is not None:
+        payload["name"] = name
+    if price is not None:
+        payload["price"] = price
+    if stock is not None:
+        payload["stock"] = stock
+    if description is not None:
+        payload["description"] = description
+    return payload
+
+
+def _delete_product_result(response, product_id: int) -> dict:
+    if response.status_code == 404:
+        return {"success": False, "error": f"Product with ID {product_id} not found"}
+
+    data = response.json()
+    if data.get("success"):
+        catalog_cache.invalidate_product(product_id)
+        product_index.remove(product_id)
+        notify_write()
+        return {"success": True, "message": data.get("message", "Product deleted successfully")}
+    return {"success": False, "error": data.get("error", "Failed to delete product")}
+
+
+async def _afind_product(product_name: str) -> dict:
+    response = await catalog_cache.aget("/products")
+    return _find_product_result(response, product_name)
+
 
-@tool
+@async_tool(_afind_product)
 def find_product(product_name: str) -> dict:
     """Find a product by name from the store catalog.
 
+    Tolerates typos, plurals and word order. 'product' is only set when a
+    catalog name clearly matches; otherwise found is false and the ranked
+    'candidates' (id, name, score) list similar products, which are NOT the
+    product asked for.
+
     Args:
         product_name: Name of the product to search for (e.g. 'Laptop', 'Wireless Keyboard')
     """
-    with httpx.Client() as client:
-        response = client.get(f"{config.EXPRESS_API_URL}/products")
-        products = response.json()["data"]
+    response = catalog_cache.get("/products")
+    return _find_product_result(response, product_name)
+
 
-        for product in products:
-            if product_name.lower() in product["name"].lower():
-                return {"found": True, "product": product}
+async def _aget_all_products(limit: int = None, offset: int = 0, fields: list[str] = None) -> dict:
+    response = await catalog_cache.aget("/products")
+    return _all_products_result(response, limit, offset, fields)
 
-        return {"found": False, "error": f"Product '{product_name}' not found"}
 
+@async_tool(_aget_all_products)
+def get_all_products(limit: int = None, offset: int = 0, fields: list[str] = None) -> dict:
+    """List products from the store catalog, one page at a time.
 
-@tool
-def get_all_products() -> dict:
-    """Get all products from the store catalog.
+    Returns the page of products plus "total" and "next_offset" (null on the
+    last page). Pass next_offset as offset to get the following page.
 
-    Returns a list of all available products with their details including
-    id, name, description, price, and stock.
+    Args:
+        limit: Products per page (default 20, at most 50)
+        offset: Number of products to skip
+        fields: Product fields to return, from id, name, description, price, stock
+            (default id, name, price, stock)
     """
-    with httpx.Client() as client:
-        response = client.get(f"{config.EXPRESS_API_URL}/products")
-        data = response.json()
+    response = catalog_cache.get("/products")
+    return _all_products_result(response, limit, offset, fields)
 
-        if data.get("success"):
-            return {"success": True, "products": data["data"]}
-        return {"success": False, "error": "Failed to fetch products"}
 
+async def _aget_product_by_id(product_id: int) -> dict:
+    response = await catalog_cache.aget(f"/products/{product_id}")
+    return _product_result(response, product_id, "Failed to fetch product")
 
-@tool
+
+@async_tool(_aget_product_by_id)
 def get_product_by_id(product_id: int) -> dict:
     """Get a single product by its ID.
 
     Args:
         product_id: The unique ID of the product to retrieve
     """
-    with httpx.Client() as client:
-        response = client.get(f"{config.EXPRESS_API_URL}/products/{product_id}")
+    response = catalog_cache.get(f"/products/{product_id}")
+    return _product_result(response, product_id, "Failed to fetch product")
 
-        if response.status_code == 404:
-            return {"success": False, "error": f"Product with ID {product_id} not found"}
 
-        data = response.json()
-        if data.get("success"):
-            return {"success": True, "product": data["data"]}
-        return {"success": False, "error": data.get("error", "Failed to fetch product")}
+async def _acreate_product(name: str, price: float, stock: int, description: str = "") -> dict:
+    payload = {"name": name, "price": price, "stock": stock, "description": description}
+    response = await express_client.arequest("POST", "/products", json=payload)
+    return _create_product_result(response)
 
 
-@tool
+@async_tool(_acreate_product)
 def create_product(name: str, price: float, stock: int, description: str = "") -> dict:
     """Create a new product in the store catalog.
 
@@ -66,22 +181,27 @@ def create_product(name: str, price: float, stock: int, description: str = "") -
         stock: Available stock quantity (e.g. 100)
         description: Optional description of the product
     """
-    with httpx.Client() as client:
-        payload = {
-            "name": name,
-            "price": price,
-            "stock": stock,
-            "description": description,
-        }
-        response = client.post(f"{config.EXPRESS_API_URL}/products", json=payload)
-        data = response.json()
+    payload = {"name": name, "price": price, "stock": stock, "description": description}
+    response = express_client.request("POST", "/products", json=payload)
+    return _create_product_result(response)
+
+
+async def _aupdate_product(
+    product_id: int,
+    name: str = None,
+    price: float = None,
+    stock: int = None,
+    description: str = None,
+) -> dict:
+    payload = _update_payload(name, price, stock, description)
+    if not payload:
+        return {"success": False, "error": "No fields provided to update"}
 
-        if data.get("success"):
-            return {"success": True, "product": data["data"]}
-        return {"success": False, "error": data.get("error", "Failed to create product")}
+    response = await express_client.arequest("PUT", f"/products/{product_id}", json=payload)
+    return _update_product_result(response, product_id)
 
 
-@tool
+@async_tool(_aupdate_product)
 def update_product(
     product_id: int,
     name: str = None,
@@ -100,47 +220,25 @@ def update_product(
         stock: New stock quantity
         description: New description for the product
     """
-    with httpx.Client() as client:
-        payload = {}
-        if name is not None:
-            payload["name"] = name
-        if price is not None:
-            payload["price"] = price
-        if stock is not None:
-            payload["stock"] = stock
-        if description is not None:
-            payload["description"] = description
-
-        if not payload:
-            return {"success": False, "error": "No fields provided to update"}
-
-        response = client.put(
-            f"{config.EXPRESS_API_URL}/products/{product_id}", json=payload
-        )
-
-        if response.status_code == 404:
-            return {"success": False, "error": f"Product with ID {product_id} not found"}
-
-        data = response.json()
-        if data.get("success"):
-            return {"success": True, "product": data["data"]}
-        return {"success": False, "error": data.get("error", "Failed to update product")}
-
-
-@tool
+    payload = _update_payload(name, price, stock, description)
+    if not payload:
+        return {"success": False, "error": "No fields provided to update"}
+
+    response = express_client.request("PUT", f"/products/{product_id}", json=payload)
+    return _update_product_result(response, product_id)
+
+
+async def _adelete_product(product_id: int) -> dict:
+    response = await express_client.arequest("DELETE", f"/products/{product_id}")
+    return _delete_product_result(response, product_id)
+
+
+@async_tool(_adelete_product)
 def delete_product(product_id: int) -> dict:
     """Delete a product from the store catalog.
 
     Args:
         product_id: The unique ID of the product to delete
     """
-    with httpx.Client() as client:
-        response = client.delete(f"{config.EXPRESS_API_URL}/products/{product_id}")
-
-        if response.status_code == 404:
-            return {"success": False, "error": f"Product with ID {product_id} not found"}
-
-        data = response.json()
-        if data.get("success"):
-            return {"success": True, "message": data.get("message", "Product deleted successfully")}
-        return {"success": False, "error": data.get("error", "Failed to delete product")}
+    response = express_client.request("DELETE", f"/products/{product_id}")
+    return _delete_product_result(response, product_id)
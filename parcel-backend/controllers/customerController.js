@@ -1,4 +1,7 @@
+const { Op } = require('sequelize');
 const { Customer, Order } = require('../models');
+const { sequelize } = require('../config/database');
+const { parsePagination, parseFields, parseInclude, sendList } = require('../utils/listQuery');
 
 // Create customer
 const createCustomer = async (req, res) => {
@@ -14,9 +17,30 @@ const createCustomer = async (req, res) => {
 // Get all customers
 const getAllCustomers = async (req, res) => {
   try {
-    const customers = await Customer.findAll({
-      include: [{ model: Order, as: 'orders' }]
-    });
+    // Orders are included unless ?include= leaves them out
+    const include = parseInclude(req.query, ['orders']);
+    await sendList(res, Customer, {
+      attributes: parseFields(req.query, Customer),
+      include: include === null || include.includes('orders') ? [{ model: Order, as: 'orders' }] : []
+    }, parsePagination(req.query));
+  } catch (error) {
+    res.status(500).json({ success: false, error: error.message });
+  }
+};
+
+// Search customers by email (exact, case-insensitive) or name (partial)
+const searchCustomers = async (req, res) => {
+  try {
+    const { email, name } = req.query;
+    let where;
+    if (email) {
+      where = sequelize.where(sequelize.fn('lower', sequelize.col('email')), email.toLowerCase());
+    } else if (name) {
+      where = { name: { [Op.iLike]: `%${name}%` } };
+    } else {
+      return res.status(400).json({ success: false, error: 'Provide an email or name query parameter' });
+    }
+    const customers = await Customer.findAll({ where, order: [['id', 'ASC']], limit: 20 });
     res.status(200).json({ success: true, data: customers });
   } catch (error) {
     res.status(500).json({ success: false, error: error.message });
@@ -70,6 +94,7 @@ const deleteCustomer = async (req, res) => {
 module.exports = {
   createCustomer,
   getAllCustomers,
+  searchCustomers,
   getCustomerById,
   updateCustomer,
   deleteCustomer
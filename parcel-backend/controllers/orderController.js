@@ -1,53 +1,110 @@
 const { Order, OrderItem, Customer, Product } = require('../models');
+const { UniqueConstraintError } = require('sequelize');
 const { sequelize } = require('../config/database');
+const { parsePagination, parseFields, parseInclude, sendList } = require('../utils/listQuery');
 
-// Create order
+// Idempotency-Key header, or idempotency_key in the body
+const getIdempotencyKey = (req) => req.get('Idempotency-Key') || req.body.idempotency_key || null;
+
+// Total quantity per product as "productId:quantity" pairs, so orders compare regardless of item order
+const itemSignature = (items) => {
+  const quantities = new Map();
+  for (const item of items) {
+    const productId = String(item.productId);
+    quantities.set(productId, (quantities.get(productId) || 0) + (item.quantity || 1));
+  }
+  return [...quantities].map(([productId, quantity]) => `${productId}:${quantity}`).sort().join(',');
+};
+
+// Answer with the order already created under this key; returns false if there is none.
+// A key reused for another customer or other items is rejected rather than replayed.
+const replayOrder = async (res, idempotencyKey, customerId, items) => {
+  const order = await Order.findOne({
+    where: { idempotencyKey },
+    include: [
+      { model: Customer, as: 'customer' },
+      { model: OrderItem, as: 'items', include: [{ model: Product, as: 'product' }] }
+    ]
+  });
+  if (!order) {
+    return false;
+  }
+  if (String(order.customerId) !== String(customerId)) {
+    res.status(409).json({ success: false, error: 'Idempotency key was already used for another customer' });
+  } else if (itemSignature(order.items) !== itemSignature(items)) {
+    res.status(422).json({ success: false, error: 'Idempotency key was already used for a different order' });
+  } else {
+    res.status(200).json({ success: true, data: order, replayed: true });
+  }
+  return true;
+};
+
+// Create one order with many items in a single transaction
 const createOrder = async (req, res) => {
+  const { customerId, items } = req.body;
+  if (!Array.isArray(items) || items.length === 0) {
+    return res.status(400).json({ success: false, error: 'items must be a non-empty array' });
+  }
+  const idempotencyKey = getIdempotencyKey(req);
+  if (idempotencyKey && await replayOrder(res, idempotencyKey, customerId, items)) {
+    return;
+  }
+
   const transaction = await sequelize.transaction();
   try {
-    const { customerId, items } = req.body;
-
     // Verify customer exists
-    const customer = await Customer.findByPk(customerId);
+    const customer = await Customer.findByPk(customerId, { transaction });
     if (!customer) {
       await transaction.rollback();
       return res.status(404).json({ success: false, error: 'Customer not found' });
     }
 
+    // Total quantity per product, so a product listed twice is checked against its stock once
+    const quantities = new Map();
+    for (const item of items) {
+      const quantity = item.quantity || 1;
+      if (!Number.isInteger(quantity) || quantity < 1) {
+        await transaction.rollback();
+        return res.status(400).json({ success: false, error: `Invalid quantity for product ${item.productId}` });
+      }
+      quantities.set(item.productId, (quantities.get(item.productId) || 0) + quantity);
+    }
+
+    // Load every product in one query; the row locks keep concurrent orders from overselling
+    const products = await Product.findAll({
+      where: { id: [...quantities.keys()] },
+      transaction,
+      lock: transaction.LOCK.UPDATE
+    });
+    const productsById = new Map(products.map(product => [String(product.id), product]));
+
     // Calculate total and validate products
     let totalAmount = 0;
     const orderItems = [];
 
-    for (const item of items) {
-      const product = await Product.findByPk(item.productId);
+    for (const [productId, quantity] of quantities) {
+      const product = productsById.get(String(productId));
       if (!product) {
         await transaction.rollback();
-        return res.status(404).json({ success: false, error: `Product ${item.productId} not found` });
+        return res.status(404).json({ success: false, error: `Product ${productId} not found` });
       }
-      if (product.stock < item.quantity) {
+      if (product.stock < quantity) {
         await transaction.rollback();
         return res.status(400).json({ success: false, error: `Insufficient stock for ${product.name}` });
       }
 
-      const itemTotal = parseFloat(product.price) * item.quantity;
-      totalAmount += itemTotal;
-      orderItems.push({
-        productId: item.productId,
-        quantity: item.quantity,
-        price: product.price
-      });
+      totalAmount += parseFloat(product.price) * quantity;
+      orderItems.push({ productId: product.id, quantity, price: product.price });
 
       // Reduce stock
-      await product.update({ stock: product.stock - item.quantity }, { transaction });
+      await product.update({ stock: product.stock - quantity }, { transaction });
     }
 
     // Create order
-    const order = await Order.create({ customerId, totalAmount }, { transaction });
+    const order = await Order.create({ customerId, totalAmount, idempotencyKey }, { transaction });
 
     // Create order items
-    for (const item of orderItems) {
-      await OrderItem.create({ ...item, orderId: order.id }, { transaction });
-    }
+    await OrderItem.bulkCreate(orderItems.map(item => ({ ...item, orderId: order.id })), { transaction });
 
     await transaction.commit();
 
@@ -62,6 +119,10 @@ const createOrder = async (req, res) => {
     res.status(201).json({ success: true, data: completeOrder });
   } catch (error) {
     await transaction.rollback();
+    // A concurrent request with the same key won the race
+    if (error instanceof UniqueConstraintError && idempotencyKey && await replayOrder(res, idempotencyKey, customerId, items)) {
+      return;
+    }
     res.status(400).json({ success: false, error: error.message });
   }
 };
@@ -69,13 +130,22 @@ const createOrder = async (req, res) => {
 // Get all orders
 const getAllOrders = async (req, res) => {
   try {
-    const orders = await Order.findAll({
-      include: [
+    // Without ?include= orders come with the full customer and items with products;
+    // with it, only the named relations are added, in a compact form
+    const include = parseInclude(req.query, ['customer', 'items']);
+    const relations = include === null
+      ? [
         { model: Customer, as: 'customer' },
         { model: OrderItem, as: 'items', include: [{ model: Product, as: 'product' }] }
       ]
-    });
-    res.status(200).json({ success: true, data: orders });
+      : [
+        ...(include.includes('customer') ? [{ model: Customer, as: 'customer', attributes: ['id', 'name', 'email'] }] : []),
+        ...(include.includes('items') ? [{ model: OrderItem, as: 'items', attributes: ['id', 'productId', 'quantity', 'price'] }] : [])
+      ];
+    await sendList(res, Order, {
+      attributes: parseFields(req.query, Order),
+      include: relations
+    }, parsePagination(req.query));
   } catch (error) {
     res.status(500).json({ success: false, error: error.message });
   }
@@ -166,10 +236,16 @@ const deleteOrder = async (req, res) => {
 
 // Quick create order with just customerId and productId
 const quickCreateOrder = async (req, res) => {
+  const customerId = req.params.customerId;
+  const { product_id } = req.body;
+  const quickItems = [{ productId: product_id, quantity: 1 }];
+  const idempotencyKey = getIdempotencyKey(req);
+  if (idempotencyKey && await replayOrder(res, idempotencyKey, customerId, quickItems)) {
+    return;
+  }
+
   const transaction = await sequelize.transaction();
   try {
-    const customerId = req.params.customerId;
-    const { product_id } = req.body;
 
     const customer = await Customer.findByPk(customerId);
     if (!customer) {
@@ -194,7 +270,7 @@ const quickCreateOrder = async (req, res) => {
     await product.update({ stock: product.stock - 1 }, { transaction });
 
     // Create order
-    const order = await Order.create({ customerId, totalAmount }, { transaction });
+    const order = await Order.create({ customerId, totalAmount, idempotencyKey }, { transaction });
 
     // Create order item
     await OrderItem.create({ orderId: order.id, productId: product_id, quantity: 1, price: product.price }, { transaction });
@@ -211,6 +287,10 @@ const quickCreateOrder = async (req, res) => {
     res.status(201).json({ success: true, data: completeOrder });
   } catch (error) {
     await transaction.rollback();
+    // A concurrent request with the same key won the race
+    if (error instanceof UniqueConstraintError && idempotencyKey && await replayOrder(res, idempotencyKey, customerId, quickItems)) {
+      return;
+    }
     res.status(400).json({ success: false, error: error.message });
   }
 };
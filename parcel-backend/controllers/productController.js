@@ -1,4 +1,5 @@
 const { Product } = require('../models');
+const { parsePagination, parseFields, sendList } = require('../utils/listQuery');
 
 // Create product
 const createProduct = async (req, res) => {
@@ -14,8 +15,7 @@ const createProduct = async (req, res) => {
 // Get all products
 const getAllProducts = async (req, res) => {
   try {
-    const products = await Product.findAll();
-    res.status(200).json({ success: true, data: products });
+    await sendList(res, Product, { attributes: parseFields(req.query, Product) }, parsePagination(req.query));
   } catch (error) {
     res.status(500).json({ success: false, error: error.message });
   }
@@ -29,7 +29,14 @@ const Customer = sequelize.define('Customer', {
   }
 }, {
   tableName: 'customers',
-  timestamps: true
+  timestamps: true,
+  indexes: [
+    // Backs the case-insensitive lookup in GET /customers/search?email=
+    {
+      name: 'customers_email_lower_idx',
+      fields: [sequelize.fn('lower', sequelize.col('email'))]
+    }
+  ]
 });
 
 module.exports = Customer;
@@ -23,6 +23,12 @@ const Order = sequelize.define('Order', {
   status: {
     type: DataTypes.ENUM('pending', 'processing', 'shipped', 'delivered', 'cancelled'),
     defaultValue: 'pending'
+  },
+  // Client-supplied key (e.g. Gmail message ID + product) so a retried request can't create a second order
+  idempotencyKey: {
+    type: DataTypes.STRING(128),
+    allowNull: true,
+    unique: true
   }
 }, {
   tableName: 'orders',
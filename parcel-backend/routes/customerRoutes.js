@@ -3,6 +3,7 @@ const router = express.Router();
 const {
   createCustomer,
   getAllCustomers,
+  searchCustomers,
   getCustomerById,
   updateCustomer,
   deleteCustomer
@@ -11,6 +12,7 @@ const { quickCreateOrder } = require('../controllers/orderController');
 
 router.post('/', createCustomer);
 router.get('/', getAllCustomers);
+router.get('/search', searchCustomers);
 router.get('/:id', getCustomerById);
 router.put('/:id', updateCustomer);
 router.delete('/:id', deleteCustomer);
@@ -6,11 +6,10 @@ const {
   getOrderById,
   getOrdersByCustomer,
   updateOrderStatus,
-  deleteOrder,
-  quickCreateOrder
+  deleteOrder
 } = require('../controllers/orderController');
 
-router.post('/', quickCreateOrder);
+router.post('/', createOrder);
 router.get('/', getAllOrders);
 router.get('/:id', getOrderById);
 router.get('/customer/:customerId', getOrdersByCustomer);
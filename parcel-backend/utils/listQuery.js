@@ -0,0 +1,57 @@
+// Shared ?limit=&offset=&fields=&include= handling for the list routes.
+// A request without limit/offset keeps the old unpaginated response, which the
+// agent's catalog cache and customer index rely on.
+
+const DEFAULT_LIMIT = 50;
+const MAX_LIMIT = 200;
+
+// Returns { limit, offset }, or null when the request isn't paginated
+const parsePagination = (query) => {
+  if (query.limit === undefined && query.offset === undefined) {
+    return null;
+  }
+  const limit = Math.min(Math.max(parseInt(query.limit, 10) || DEFAULT_LIMIT, 1), MAX_LIMIT);
+  const offset = Math.max(parseInt(query.offset, 10) || 0, 0);
+  return { limit, offset };
+};
+
+// Returns the requested attributes of model (unknown names are ignored), or undefined for all
+const parseFields = (query, model) => {
+  if (!query.fields) {
+    return undefined;
+  }
+  const allowed = Object.keys(model.rawAttributes);
+  const fields = query.fields.split(',').map(field => field.trim()).filter(field => allowed.includes(field));
+  // The primary key is needed to attach included rows
+  return fields.includes('id') ? fields : ['id', ...fields];
+};
+
+// Returns the names from ?include= that appear in allowed, or null when the parameter is absent
+const parseInclude = (query, allowed) => {
+  if (query.include === undefined) {
+    return null;
+  }
+  return query.include.split(',').map(name => name.trim()).filter(name => allowed.includes(name));
+};
+
+// Runs findAll, or findAndCountAll with the page applied, and sends the response
+const sendList = async (res, model, options, page) => {
+  if (!page) {
+    const rows = await model.findAll(options);
+    return res.status(200).json({ success: true, data: rows });
+  }
+  const { rows, count } = await model.findAndCountAll({
+    ...options,
+    limit: page.limit,
+    offset: page.offset,
+    order: [['id', 'ASC']],
+    distinct: true
+  });
+  res.status(200).json({
+    success: true,
+    data: rows,
+    pagination: { limit: page.limit, offset: page.offset, total: count, hasMore: page.offset + rows.length < count }
+  });
+};
+
+module.exports = { DEFAULT_LIMIT, MAX_LIMIT, parsePagination, parseFields, parseInclude, sendList };